@@ -5,7 +5,12 @@ Cliente Asíncrono Optimizado para Termux/Android - VERSIÓN CON CONTROL DE LOGS
 Versión con control de verbosidad y rotación automática de logs
 """
 
+import functools
+import heapq
 import json
+import operator
+import random
+import re
 import time
 import socket
 import logging
@@ -16,16 +21,22 @@ import subprocess
 import signal
 import sys
 import os
+import threading
+import uuid
+import queue
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field
 from concurrent.futures import ThreadPoolExecutor
+from textwrap import wrap
 from pathlib import Path
-from logging.handlers import TimedRotatingFileHandler, RotatingFileHandler
+from logging.handlers import (TimedRotatingFileHandler, RotatingFileHandler,
+                              QueueHandler, QueueListener)
 
 # Imports para impresoras
 try:
-    from escpos.printer import Network
+    from escpos.printer import Network, Dummy
     from escpos.exceptions import Error as EscposError
     ESCPOS_AVAILABLE = True
 except ImportError:
@@ -33,6 +44,77 @@ except ImportError:
     print("⚠️  Instalar: pip install python-escpos")
     sys.exit(1)
 
+# Tope del backoff exponencial entre reintentos de impresión
+MAX_BACKOFF = 10.0
+
+# Separadores de ticket precalculados (48 columnas)
+SEP_EQ = "=" * 48 + "\n"
+SEP_DASH = "-" * 48 + "\n"
+SEP_STAR = "*" * 48 + "\n"
+
+# Extractor C-level para el escaneo de líneas modificadas
+_GET_IS_MODIFIED = operator.methodcaller('get', 'is_modified', False)
+
+# Detecta pagos en efectivo sin lowercases ni dobles escaneos por método
+_CASH_RE = re.compile(r'efectivo|cash', re.IGNORECASE)
+
+# Alias de claves que Odoo usa según versión/configuración; _first evita
+# que las cadenas de .get anidados evalúen todos los defaults en cascada
+TRACKING_KEYS = ('tracking_number', 'order_name')
+DATE_KEYS = ('order_date', 'date_order')
+TABLE_KEYS = ('table', 'table_name')
+SERVER_KEYS = ('server', 'user_name', 'cashier')
+CUSTOMER_KEYS = ('customer', 'partner_name', 'client_name')
+LINES_KEYS = ('lines', 'order_lines', 'products')
+PAYMENTS_KEYS = ('payments', 'payment_lines')
+CASHIER_KEYS = ('cashier', 'user_name', 'server')
+
+def _first(d: Dict, keys: Tuple[str, ...], default=None):
+    """Primer valor no vacío de d entre keys; corta en el primer acierto"""
+    return next((d[k] for k in keys if d.get(k)), default)
+
+class RenderBuffer(Dummy):
+    """Dummy que omite llamadas set() idénticas consecutivas.
+
+    Cada set() emite varias secuencias de escape aunque el estado no cambie;
+    descartar los duplicados recorta los bytes de cambio de modo por ticket.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._last_set = None
+
+    def set(self, **kwargs):
+        if kwargs == self._last_set:
+            return
+        self._last_set = kwargs
+        super().set(**kwargs)
+
+    # barcode/qr pueden alterar estado internamente: invalidar el cache
+    def barcode(self, *args, **kwargs):
+        self._last_set = None
+        super().barcode(*args, **kwargs)
+
+    def qr(self, *args, **kwargs):
+        self._last_set = None
+        super().qr(*args, **kwargs)
+
+
+# orjson (opcional): encoder/decoder JSON en C, 2-5x más rápido que stdlib
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _json_loads(data):
+    """Parsea JSON con orjson si está instalado, si no con stdlib"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
 # Activar wakelock automáticamente
 def setup_wakelock(enable_termux=False):
     """Configura wakelock para mantener dispositivo activo"""
@@ -85,6 +167,13 @@ class PrinterConfig:
     connection_timeout: int = 8
     keep_alive_interval: int = 300
     max_idle_time: int = 600
+    # Pausa de estabilización tras imprimir (0 = sin pausa); se espera en la
+    # capa asyncio, nunca bloqueando un worker del pool
+    post_print_settle: float = 0.0
+    # Modo simulación: renderiza y reporta éxito sin tocar la impresora
+    dry_run: bool = False
+    # Modo de corte soportado ('FULL', 'PART', 'NONE'); None usa FULL
+    cut_mode: Optional[str] = None
 
 @dataclass
 class PrinterStatus:
@@ -95,6 +184,14 @@ class PrinterStatus:
     last_successful_connection: datetime = field(default_factory=datetime.now)
     last_keep_alive: datetime = field(default_factory=datetime.now)
     last_job_printed: datetime = field(default_factory=datetime.now)
+    # Relojes monotónicos para decidir intervalos (inmunes a saltos NTP);
+    # los datetime de arriba quedan sólo para exportar al dashboard
+    last_keep_alive_mono: float = field(default_factory=time.monotonic)
+    last_job_printed_mono: float = field(default_factory=time.monotonic)
+    # Fail-fast: mientras no llegue next_probe_time (monotónico) no se
+    # despachan trabajos a una impresora marcada no saludable
+    next_probe_time: float = 0.0
+    probe_interval: float = 0.0
     consecutive_failures: int = 0
     is_healthy: bool = True
     last_error: str = ""
@@ -105,12 +202,23 @@ class PrinterStatus:
     last_response_time: float = 0.0
 
     def to_dict(self):
-        """Convierte a diccionario para JSON"""
-        data = asdict(self)
-        for key, value in data.items():
-            if isinstance(value, datetime):
-                data[key] = value.isoformat()
-        return data
+        """Convierte a diccionario para JSON (literal directo, sin el deepcopy de asdict)"""
+        return {
+            "name": self.name,
+            "ip": self.ip,
+            "token": self.token,
+            "last_successful_connection": self.last_successful_connection.isoformat(),
+            "last_keep_alive": self.last_keep_alive.isoformat(),
+            "last_job_printed": self.last_job_printed.isoformat(),
+            "consecutive_failures": self.consecutive_failures,
+            "is_healthy": self.is_healthy,
+            "last_error": self.last_error,
+            "total_jobs_printed": self.total_jobs_printed,
+            "total_keep_alives_sent": self.total_keep_alives_sent,
+            "total_keep_alives_failed": self.total_keep_alives_failed,
+            "average_response_time": self.average_response_time,
+            "last_response_time": self.last_response_time
+        }
 
 @dataclass
 class FailedJob:
@@ -120,7 +228,13 @@ class FailedJob:
     job_data: Dict
     attempts: int = 0
     last_attempt: datetime = field(default_factory=datetime.now)
+    # next_retry (datetime) queda sólo para exportar al dashboard; la
+    # planificación real usa el reloj monotónico (inmune a saltos NTP)
     next_retry: datetime = field(default_factory=datetime.now)
+    next_retry_mono: float = field(default_factory=time.monotonic)
+    # Token de idempotencia: Odoo puede descartar transiciones duplicadas si
+    # el 'done' llegó pero el ACK se perdió y el cliente reintenta
+    attempt_token: str = field(default_factory=lambda: uuid.uuid4().hex)
 
 class StatusExporter:
     """Exporta estado del sistema para dashboard"""
@@ -129,9 +243,21 @@ class StatusExporter:
         self.base_dir = Path(base_dir)
         self.status_file = self.base_dir / "status" / "system_status.json"
         self.status_file.parent.mkdir(exist_ok=True)
+        # Control de escrituras: no regrabar flash si el estado no cambió
+        self._last_export_hash = 0
+        self._last_export_ts = 0.0
+        self._max_staleness = 60
     
     def export_status(self, client_instance):
-        """Exporta estado actual del sistema"""
+        """Exporta estado actual del sistema (sólo escribe si cambió algo)"""
+        self.write_snapshot(self.build_snapshot(client_instance))
+
+    def build_snapshot(self, client_instance) -> Dict:
+        """Construye el snapshot del estado del sistema.
+
+        Debe correr en el thread del event loop: lee printer_status y
+        failed_jobs, que ese mismo thread muta entre ciclos.
+        """
         now = datetime.now()
         
         system_status = {
@@ -163,16 +289,47 @@ class StatusExporter:
                 "next_retry": failed_job.next_retry.isoformat()
             })
         
-        full_status = {
+        self._max_staleness = max(60, getattr(client_instance, 'check_interval', 3) * 20)
+
+        return {
             "system": system_status,
             "printers": printers_status,
             "failed_jobs": failed_jobs,
             "last_update": now.isoformat()
         }
-        
+
+    def write_snapshot(self, full_status: Dict):
+        """Hashea y escribe un snapshot ya construido.
+
+        No toca al cliente: seguro de correr en un thread del pool.
+        """
+        # Hash del estado sin los campos volátiles (timestamp/uptime cambian siempre)
+        core_state = {
+            "stats": full_status['system']['stats'],
+            "printers": full_status['printers'],
+            "failed_jobs": full_status['failed_jobs']
+        }
+        state_hash = hash(json.dumps(core_state, sort_keys=True, default=str))
+
+        # Estado sin cambios: omitir la escritura, con un piso de frescura
+        # (el dashboard usa el timestamp como señal de vida del servicio)
+        now_ts = time.monotonic()
+        if state_hash == self._last_export_hash and now_ts - self._last_export_ts < self._max_staleness:
+            return
+
+        self._last_export_hash = state_hash
+        self._last_export_ts = now_ts
+
         try:
-            with open(self.status_file, 'w', encoding='utf-8') as f:
-                json.dump(full_status, f, indent=2, ensure_ascii=False)
+            # Escribir a un temporal y renombrar: el dashboard nunca ve un archivo truncado
+            tmp_file = self.status_file.with_suffix('.json.tmp')
+            if ORJSON_AVAILABLE:
+                with open(tmp_file, 'wb') as f:
+                    f.write(orjson.dumps(full_status))
+            else:
+                with open(tmp_file, 'w', encoding='utf-8', buffering=1 << 16) as f:
+                    json.dump(full_status, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.status_file)
         except Exception as e:
             print(f"Error exportando estado: {e}")
 
@@ -189,16 +346,37 @@ class AsyncClient:
         
         self.printers: Dict[str, PrinterConfig] = {}
         self.printer_status: Dict[str, PrinterStatus] = {}
+        self._token_to_name: Dict[str, str] = {}
+
+        # Conexiones persistentes por impresora (evita un handshake TCP por trabajo)
+        self._printer_conns: Dict[str, Network] = {}
+        self._conn_last_use: Dict[str, float] = {}
+        self._conn_locks: Dict[str, threading.Lock] = {}
+
+        # Sesión HTTP única con pool keep-alive hacia Odoo (se crea en run())
+        self._session: Optional[aiohttp.ClientSession] = None
+
+        # Consulta batch de trabajos (se desactiva si el servidor no la soporta)
+        self._supports_batch = True
 
         self.enable_termux = enable_termux
         
-        # Sistema de reintentos
-        self.failed_jobs: Dict[int, FailedJob] = {}
+        # Sistema de reintentos (OrderedDict: expulsión FIFO O(1) al llenarse)
+        self.failed_jobs: 'OrderedDict[int, FailedJob]' = OrderedDict()
         self.max_failed_jobs = 50
         self.retry_intervals = [30, 60, 120, 300, 600]
-        
-        # Pool de threads
-        self.print_executor = ThreadPoolExecutor(max_workers=5, thread_name_prefix="printer")
+
+        # Heap de reintentos: (timestamp monotónico, job_id) — el loop sólo mira la cabeza
+        self._retry_heap: List[Tuple[float, int]] = []
+        
+        # Pool de threads para los envíos bloqueantes de python-escpos;
+        # load_config lo redimensiona según la flota y la concurrencia se
+        # acota en la capa asyncio con un semáforo
+        self.print_workers = 4
+        self.print_executor = ThreadPoolExecutor(max_workers=self.print_workers,
+                                                 thread_name_prefix="printer")
+        self.print_concurrency = 5
+        self._print_sem: Optional[asyncio.Semaphore] = None
         
         # Control de ejecución
         self.running = False
@@ -219,24 +397,25 @@ class AsyncClient:
         }
         
         # Control de keep-alive
-        self.last_keep_alive_check = datetime.now()
         self.keep_alive_interval = 60
         
         # Exportador de estado
         self.status_exporter = StatusExporter(Path.cwd() )
         
         # Setup logging con configuraciones
+        self._log_listener: Optional[QueueListener] = None
         self.setup_logging()
+        self._refresh_log_flags()
         
         # Logs de inicio según nivel
-        if self.logger.isEnabledFor(logging.INFO):
+        if self._info:
             self.logger.info("🚀 Cliente ESC/POS iniciado")
             self.logger.info(f"🌐 Odoo URL: {odoo_url}")
             self.logger.info(f"⏱️  Intervalo: {check_interval}s")
             self.logger.info(f"📝 Log level: {log_level}")
             self.logger.info(f"🔄 Rotación: {log_rotation_days} días")
         
-        if self.logger.isEnabledFor(logging.DEBUG):
+        if self._dbg:
             self.logger.debug(f"💓 Keep-alive: {self.keep_alive_interval}s")
             self.logger.debug(f"📊 Dashboard export: Activado")
             self.logger.debug(f"📱 Entorno: Termux Android")
@@ -245,6 +424,13 @@ class AsyncClient:
         print(f"🌐 Odoo: {odoo_url}")
         print(f"⏱️  Intervalo: {check_interval}s")
     
+    def _refresh_log_flags(self):
+        """Cachea qué niveles están habilitados para no llamar isEnabledFor en el hot path"""
+        self._dbg = self.logger.isEnabledFor(logging.DEBUG)
+        self._info = self.logger.isEnabledFor(logging.INFO)
+        self._warn = self.logger.isEnabledFor(logging.WARNING)
+        self._err = self.logger.isEnabledFor(logging.ERROR)
+
     def setup_logging(self):
         """Configura logging con rotación y niveles personalizables"""
         log_dir = Path.cwd() / "logs"
@@ -260,8 +446,10 @@ class AsyncClient:
         # Limpiar handlers existentes
         self.logger.handlers.clear()
         
-        # Crear handlers con rotación
+        # Crear handlers con rotación (formatter compartido: formatear una sola
+        # vez la misma cadena por handler no aporta nada)
         handlers = []
+        formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
         
         # Handler principal con rotación por tiempo (diaria)
         main_log = log_dir / "service.log"
@@ -272,8 +460,10 @@ class AsyncClient:
             backupCount=self.log_rotation_days,
             encoding='utf-8'
         )
-        main_handler.setLevel(numeric_level)
-        main_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+        # En DEBUG, service.log conserva INFO+ y detailed.log se queda el DEBUG:
+        # sin dobles escrituras del mismo registro en dos archivos
+        main_handler.setLevel(max(numeric_level, logging.INFO))
+        main_handler.setFormatter(formatter)
         handlers.append(main_handler)
         
         # Handler detallado con rotación por tamaño (solo si DEBUG)
@@ -286,19 +476,27 @@ class AsyncClient:
                 encoding='utf-8'
             )
             detailed_handler.setLevel(logging.DEBUG)
-            detailed_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+            detailed_handler.addFilter(lambda record: record.levelno == logging.DEBUG)
+            detailed_handler.setFormatter(formatter)
             handlers.append(detailed_handler)
         
         # Handler de consola
         console_handler = logging.StreamHandler(sys.stdout)
         console_level = logging.WARNING if numeric_level > logging.INFO else logging.INFO
         console_handler.setLevel(console_level)
-        console_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+        console_handler.setFormatter(formatter)
         handlers.append(console_handler)
         
-        # Agregar handlers al logger
-        for handler in handlers:
-            self.logger.addHandler(handler)
+        # Los handlers reales viven detrás de un QueueListener en su propio
+        # thread: escribir/rotar en disco nunca bloquea el event loop.
+        # Cola y handlers quedan guardados para poder relanzar el listener
+        # si run() se invoca de nuevo tras un cierre
+        self._log_queue = queue.SimpleQueue()
+        self._log_handlers = handlers
+        self.logger.addHandler(QueueHandler(self._log_queue))
+        self._log_listener = QueueListener(self._log_queue, *handlers,
+                                           respect_handler_level=True)
+        self._log_listener.start()
         
         # Evitar propagación al root logger
         self.logger.propagate = False
@@ -318,22 +516,22 @@ class AsyncClient:
     
     def load_config(self, config_file: str) -> bool:
         """Carga configuración con logging adaptativo"""
-        if self.logger.isEnabledFor(logging.INFO):
+        if self._info:
             self.logger.info(f"📂 Cargando configuración: {config_file}")
         
         try:
             config_path = Path(config_file)
             if not config_path.exists():
-                self.logger.error(f"❌ Config no encontrado: {config_file}")
+                self.logger.error("❌ Config no encontrado: %s", config_file)
                 return False
             
-            if self.logger.isEnabledFor(logging.DEBUG):
+            if self._dbg:
                 self.logger.debug(f"Archivo encontrado, tamaño: {config_path.stat().st_size} bytes")
             
             with open(config_path, 'r', encoding='utf-8') as f:
                 config_data = json.load(f)
             
-            if self.logger.isEnabledFor(logging.DEBUG):
+            if self._dbg:
                 self.logger.debug(f"JSON cargado, claves: {list(config_data.keys())}")
             
             if 'printers' not in config_data:
@@ -341,12 +539,12 @@ class AsyncClient:
                 return False
             
             printer_count = len(config_data['printers'])
-            if self.logger.isEnabledFor(logging.INFO):
+            if self._info:
                 self.logger.info(f"📋 Procesando {printer_count} impresoras")
             
             for i, printer_data in enumerate(config_data['printers']):
                 try:
-                    if self.logger.isEnabledFor(logging.DEBUG):
+                    if self._dbg:
                         self.logger.debug(f"Procesando impresora {i+1}: {printer_data.get('name', 'SIN_NOMBRE')}")
                     
                     printer = PrinterConfig(
@@ -359,34 +557,38 @@ class AsyncClient:
                         retry_delay=printer_data.get('retry_delay', 2),
                         connection_timeout=printer_data.get('connection_timeout', 8),
                         keep_alive_interval=printer_data.get('keep_alive_interval', 300),
-                        max_idle_time=printer_data.get('max_idle_time', 600)
+                        max_idle_time=printer_data.get('max_idle_time', 600),
+                        post_print_settle=printer_data.get('post_print_settle', 0.0),
+                        dry_run=printer_data.get('dry_run', False),
+                        cut_mode=printer_data.get('cut_mode')
                     )
                     
                     if printer.active:
                         self.printers[printer.token] = printer
+                        self._token_to_name[printer.token] = printer.name
                         self.printer_status[printer.token] = PrinterStatus(
                             name=printer.name,
                             ip=printer.ip,
                             token=printer.token
                         )
                         
-                        if self.logger.isEnabledFor(logging.INFO):
+                        if self._info:
                             self.logger.info(f"📎 {printer.name}: {printer.ip}:{printer.port}")
                         
-                        if self.logger.isEnabledFor(logging.DEBUG):
+                        if self._dbg:
                             self.logger.debug(f"   Token: {printer.token[:8]}...")
                             self.logger.debug(f"   Keep-alive: {printer.keep_alive_interval}s")
                             self.logger.debug(f"   Max reintentos: {printer.max_retries}")
                     else:
-                        if self.logger.isEnabledFor(logging.WARNING):
+                        if self._warn:
                             self.logger.warning(f"⚠️  {printer.name} configurada pero INACTIVA")
                     
                 except KeyError as e:
-                    self.logger.error(f"❌ Impresora {i+1} inválida, falta: {e}")
+                    self.logger.error("❌ Impresora %s inválida, falta: %s", i + 1, e)
                     self.stats['total_errors'] += 1
                     continue
                 except Exception as e:
-                    self.logger.error(f"❌ Error procesando impresora {i+1}: {e}")
+                    self.logger.error("❌ Error procesando impresora %s: %s", i + 1, e)
                     self.stats['total_errors'] += 1
                     continue
             
@@ -394,17 +596,31 @@ class AsyncClient:
                 self.logger.error("❌ No se cargaron impresoras válidas")
                 return False
             
-            if self.logger.isEnabledFor(logging.INFO):
+            if self._info:
                 self.logger.info(f"✅ Configuración cargada: {len(self.printers)} impresoras activas")
             
+            # Dimensionar el pool según la flota: 2 workers por impresora,
+            # acotado a [4, 32]; sin esto los keep-alives en paralelo se
+            # serializarían por falta de threads
+            workers = min(32, max(4, len(self.printers) * 2))
+            if self.print_executor is None or workers != self.print_workers:
+                old_executor = self.print_executor
+                self.print_executor = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix="printer"
+                )
+                self.print_workers = workers
+                if old_executor is not None:
+                    old_executor.shutdown(wait=False)
+            
             return True
             
         except json.JSONDecodeError as e:
-            self.logger.error(f"❌ Error JSON en {config_file}: línea {e.lineno}")
+            self.logger.error("❌ Error JSON en %s: línea %s", config_file, e.lineno)
             self.stats['total_errors'] += 1
             return False
         except Exception as e:
-            self.logger.error(f"❌ Error cargando configuración: {e}")
+            self.logger.error("❌ Error cargando configuración: %s", e)
             self.stats['total_errors'] += 1
             return False
     
@@ -412,23 +628,32 @@ class AsyncClient:
         """Crea conexión con logging adaptativo"""
         operation = "keep-alive" if for_keep_alive else "trabajo"
         
-        if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug(f"🔌 Conectando para {operation} - {printer_config.name}")
+        if self._dbg:
+            self.logger.debug("🔌 Conectando para %s - %s", operation, printer_config.name)
         
         try:
             timeout = 3 if for_keep_alive else printer_config.connection_timeout
             start_time = time.time()
             
             printer = Network(
-                printer_config.ip, 
+                printer_config.ip,
                 port=printer_config.port,
                 timeout=timeout
             )
-            
+
+            # El ticket ya viaja en un solo _raw(); TCP_NODELAY asegura que ese
+            # único write salga inmediato en vez de esperar ACKs (Nagle)
+            try:
+                printer.device.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                # Buffer de envío holgado: el ticket completo cabe en un write
+                printer.device.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+            except (AttributeError, OSError):
+                pass
+
             connection_time = time.time() - start_time
             
-            if self.logger.isEnabledFor(logging.DEBUG):
-                self.logger.debug(f"✅ Conexión creada en {connection_time:.2f}s")
+            if self._dbg:
+                self.logger.debug("✅ Conexión creada en %.2fs", connection_time)
             
             # Actualizar tiempo de respuesta
             if printer_config.token in self.printer_status:
@@ -442,297 +667,513 @@ class AsyncClient:
             return printer
             
         except socket.timeout:
-            if not for_keep_alive or self.logger.isEnabledFor(logging.DEBUG):
-                self.logger.warning(f"⏱️  Timeout conectando a {printer_config.name}")
+            if not for_keep_alive or self._dbg:
+                self.logger.warning("⏱️  Timeout conectando a %s", printer_config.name)
             return None
         except ConnectionRefusedError:
-            if not for_keep_alive or self.logger.isEnabledFor(logging.DEBUG):
-                self.logger.warning(f"🚫 Conexión rechazada: {printer_config.name}")
+            if not for_keep_alive or self._dbg:
+                self.logger.warning("🚫 Conexión rechazada: %s", printer_config.name)
             return None
         except Exception as e:
             if not for_keep_alive:
-                self.logger.error(f"❌ Error conectando a {printer_config.name}: {e}")
+                self.logger.error("❌ Error conectando a %s: %s", printer_config.name, e)
             return None
-    
-    def test_printer_with_keep_alive(self, printer_config: PrinterConfig) -> Tuple[bool, str]:
-        """Test con logging mínimo para keep-alive"""
-        if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug(f"💓 Keep-alive test: {printer_config.name}")
-        
-        try:
-            start_time = time.time()
-            printer = self.create_printer_connection(printer_config, for_keep_alive=True)
-            if not printer:
-                return False, "Sin conexión"
-            
-            # Comando keep-alive
-            printer._raw(b'\x1B\x40')
-            
+
+    def get_printer_connection(self, printer_config: PrinterConfig, for_keep_alive: bool = False) -> Optional[Network]:
+        """Devuelve la conexión persistente de la impresora, reconectando sólo si hace falta"""
+        token = printer_config.token
+        lock = self._conn_locks.setdefault(token, threading.Lock())
+
+        with lock:
+            conn = self._printer_conns.get(token)
+            if conn is not None:
+                idle = time.monotonic() - self._conn_last_use.get(token, 0.0)
+                if idle < printer_config.max_idle_time:
+                    self._conn_last_use[token] = time.monotonic()
+                    return conn
+
+                # Conexión ociosa demasiado tiempo: descartar y reconectar
+                if self._dbg:
+                    self.logger.debug("🔌 Conexión ociosa %.0fs, reconectando %s", idle, printer_config.name)
+                self._drop_printer_connection(token)
+
+            conn = self.create_printer_connection(printer_config, for_keep_alive)
+            if conn is not None:
+                self._printer_conns[token] = conn
+                self._conn_last_use[token] = time.monotonic()
+            return conn
+
+    def _drop_printer_connection(self, token: str):
+        """Cierra y olvida la conexión cacheada de una impresora"""
+        conn = self._printer_conns.pop(token, None)
+        self._conn_last_use.pop(token, None)
+        if conn is not None:
             try:
-                printer.close()
+                conn.close()
             except:
                 pass
-            
-            total_time = time.time() - start_time
-            return True, f"OK ({total_time:.2f}s)"
-            
+
+    def test_printer_with_keep_alive(self, printer_config: PrinterConfig) -> Tuple[bool, str]:
+        """Test con logging mínimo para keep-alive"""
+        if self._dbg:
+            self.logger.debug("💓 Keep-alive test: %s", printer_config.name)
+
+        start_time = time.time()
+        token = printer_config.token
+
+        # Con conexión cacheada: dos bytes sobre el socket existente, sin reconectar
+        conn = self._printer_conns.get(token)
+        if conn is not None:
+            lock = self._conn_locks.setdefault(token, threading.Lock())
+            try:
+                with lock:
+                    conn._raw(b'\x1B\x40')
+                    self._conn_last_use[token] = time.monotonic()
+                return True, f"OK ({time.time() - start_time:.2f}s)"
+            except Exception:
+                # Socket muerto: descartar y caer al probe crudo
+                self._drop_printer_connection(token)
+
+        # Sin conexión viva: probe con socket crudo, sin pagar la construcción
+        # del wrapper Network de python-escpos por dos bytes
+        try:
+            with socket.create_connection((printer_config.ip, printer_config.port), timeout=3) as s:
+                s.sendall(b'\x1B\x40')
+            return True, f"OK ({time.time() - start_time:.2f}s)"
         except Exception as e:
             return False, str(e)
-    
+
+
     def update_printer_status(self, token: str, success: bool, error_msg: str = ""):
         """Actualiza estado con logging adaptativo"""
         if token not in self.printer_status:
-            if self.logger.isEnabledFor(logging.WARNING):
-                self.logger.warning(f"⚠️  Token inexistente: {token}")
+            if self._warn:
+                self.logger.warning("⚠️  Token inexistente: %s", token)
             return
         
         status = self.printer_status[token]
+
+        # Fast-path: éxito sobre una impresora ya saludable (el caso abrumadoramente
+        # común) sólo refresca el timestamp, sin logs ni comparaciones de estado
+        if success and status.is_healthy and status.consecutive_failures == 0:
+            status.last_successful_connection = datetime.now()
+            return
+
         now = datetime.now()
         previous_health = status.is_healthy
-        
+
         if success:
             status.last_successful_connection = now
-            if status.consecutive_failures > 0 and self.logger.isEnabledFor(logging.INFO):
-                self.logger.info(f"🔄 {status.name} recuperada tras {status.consecutive_failures} fallos")
+            if status.consecutive_failures > 0 and self._info:
+                self.logger.info("🔄 %s recuperada tras %s fallos", status.name, status.consecutive_failures)
                 self.stats['connections_restored'] += 1
             status.consecutive_failures = 0
             status.is_healthy = True
             status.last_error = ""
+            status.next_probe_time = 0.0
+            status.probe_interval = 0.0
         else:
             status.consecutive_failures += 1
             status.last_error = error_msg
             
-            if self.logger.isEnabledFor(logging.WARNING):
-                self.logger.warning(f"⚠️  Fallo #{status.consecutive_failures} - {status.name}: {error_msg}")
+            if self._warn:
+                self.logger.warning("⚠️  Fallo #%s - %s: %s", status.consecutive_failures, status.name, error_msg)
             
             if status.consecutive_failures >= 3 and status.is_healthy:
                 status.is_healthy = False
-                self.logger.error(f"🚨 {status.name} marcada como NO SALUDABLE")
+                self.logger.error("🚨 %s marcada como NO SALUDABLE", status.name)
                 self.stats['total_errors'] += 1
+
+            # Backoff exponencial del sondeo: 1s, 2s, 4s... con tope de 10s
+            if not status.is_healthy:
+                status.probe_interval = min(max(status.probe_interval * 2, 1.0), MAX_BACKOFF)
+                status.next_probe_time = time.monotonic() + status.probe_interval
         
         # Log cambio de estado
-        if previous_health != status.is_healthy and self.logger.isEnabledFor(logging.INFO):
+        if previous_health != status.is_healthy and self._info:
             health_change = "SALUDABLE" if status.is_healthy else "NO SALUDABLE"
-            self.logger.info(f"🔄 {status.name} cambió a: {health_change}")
+            self.logger.info("🔄 %s cambió a: %s", status.name, health_change)
     
     async def perform_keep_alive(self):
         """Keep-alive con logging eficiente"""
         now = datetime.now()
-        if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug(f"💓 Verificación keep-alive: {now.strftime('%H:%M:%S')}")
+        if self._dbg:
+            self.logger.debug("💓 Verificación keep-alive: %s", now.strftime('%H:%M:%S'))
         
-        keep_alives_sent = 0
-        keep_alives_successful = 0
+        loop = asyncio.get_running_loop()
         
+        # Reunir las impresoras inactivas y dispararles el keep-alive en paralelo:
+        # el ciclo completo tarda el máximo de los timeouts, no la suma
+        due = []
+        now_mono = time.monotonic()
         for token, printer_config in self.printers.items():
             status = self.printer_status[token]
             
-            time_since_last_activity = now - max(status.last_keep_alive, status.last_job_printed)
-            seconds_since_activity = time_since_last_activity.total_seconds()
+            seconds_since_activity = now_mono - max(status.last_keep_alive_mono,
+                                                    status.last_job_printed_mono)
             
             if seconds_since_activity > printer_config.keep_alive_interval:
-                keep_alives_sent += 1
-                
-                if self.logger.isEnabledFor(logging.INFO):
-                    self.logger.info(f"💓 Keep-alive a {printer_config.name} ({seconds_since_activity:.0f}s inactiva)")
+                due.append((token, printer_config))
+                if self._info:
+                    self.logger.info("💓 Keep-alive a %s (%.0fs inactiva)", printer_config.name, seconds_since_activity)
+        
+        if not due:
+            return
+        
+        results = await asyncio.gather(
+            *(loop.run_in_executor(self.print_executor, self.test_printer_with_keep_alive, cfg)
+              for _, cfg in due),
+            return_exceptions=True
+        )
+        
+        keep_alives_successful = 0
+        for (token, printer_config), result in zip(due, results):
+            status = self.printer_status[token]
+            
+            if isinstance(result, Exception):
+                success, error = False, str(result)
+            else:
+                success, error = result
+            
+            if success:
+                status.last_keep_alive = now
+                status.last_keep_alive_mono = time.monotonic()
+                status.total_keep_alives_sent += 1
+                keep_alives_successful += 1
+                self.stats['keep_alives_sent'] += 1
                 
-                loop = asyncio.get_event_loop()
-                success, error = await loop.run_in_executor(
-                    self.print_executor,
-                    self.test_printer_with_keep_alive,
-                    printer_config
-                )
+                if self._info:
+                    self.logger.info("💓 Keep-alive OK: %s", printer_config.name)
+                self.update_printer_status(token, True)
+            else:
+                status.total_keep_alives_failed += 1
+                self.stats['keep_alives_failed'] += 1
                 
-                if success:
-                    status.last_keep_alive = now
-                    status.total_keep_alives_sent += 1
-                    keep_alives_successful += 1
-                    self.stats['keep_alives_sent'] += 1
-                    
-                    if self.logger.isEnabledFor(logging.INFO):
-                        self.logger.info(f"💓 Keep-alive OK: {printer_config.name}")
-                    self.update_printer_status(token, True)
-                else:
-                    status.total_keep_alives_failed += 1
-                    self.stats['keep_alives_failed'] += 1
-                    
-                    if self.logger.isEnabledFor(logging.WARNING):
-                        self.logger.warning(f"💓 Keep-alive FALLO: {printer_config.name} - {error}")
-                    self.update_printer_status(token, False, f"Keep-alive: {error}")
+                if self._warn:
+                    self.logger.warning("💓 Keep-alive FALLO: %s - %s", printer_config.name, error)
+                self.update_printer_status(token, False, f"Keep-alive: {error}")
         
-        if keep_alives_sent > 0 and self.logger.isEnabledFor(logging.INFO):
-            self.logger.info(f"💓 Keep-alive completado: {keep_alives_successful}/{keep_alives_sent} exitosos")
+        if self._info:
+            self.logger.info("💓 Keep-alive completado: %s/%s exitosos", keep_alives_successful, len(due))
     
-    async def get_jobs_from_odoo(self, session: aiohttp.ClientSession, token: str) -> List[Dict]:
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """Crea la sesión HTTP compartida con pool de conexiones keep-alive"""
+        connector = aiohttp.TCPConnector(
+            limit=32,
+            limit_per_host=8,
+            keepalive_timeout=75,
+            enable_cleanup_closed=True,
+            ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=15),
+            headers={'Connection': 'keep-alive'}
+        )
+
+    async def aclose(self):
+        """Cierra la sesión HTTP compartida"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def _parse_job_contents(jobs: List[Dict]) -> List[Dict]:
+        """Deja 'content' parseado de una vez: los reintentos no repiten json.loads"""
+        for job in jobs:
+            content = job.get('content')
+            if isinstance(content, str):
+                try:
+                    job['content'] = _json_loads(content)
+                except (ValueError, TypeError):
+                    pass
+        return jobs
+
+    async def get_jobs_from_odoo(self, token: str) -> List[Dict]:
         """Obtiene trabajos con logging eficiente"""
-        printer_name = next((p.name for p in self.printers.values() if p.token == token), token[:8])
+        printer_name = self._token_to_name.get(token, token[:8])
         
-        if self.logger.isEnabledFor(logging.DEBUG):
-            self.logger.debug(f"🌐 Consultando trabajos: {printer_name}")
+        if self._dbg:
+            self.logger.debug("🌐 Consultando trabajos: %s", printer_name)
         
         try:
             url = f"{self.odoo_url}/api/pos_virtual_print/jobs"
             
-            async with session.post(
+            async with self._session.post(
                 url, 
                 json={"token": token},
                 timeout=aiohttp.ClientTimeout(total=10)
             ) as response:
                 
-                if self.logger.isEnabledFor(logging.DEBUG):
+                if self._dbg:
                     request_time = 0  # Simplificado para eficiencia
-                    self.logger.debug(f"🌐 HTTP {response.status} para {printer_name}")
+                    self.logger.debug("🌐 HTTP %s para %s", response.status, printer_name)
                 
                 if response.status == 200:
-                    data = await response.json()
+                    data = _json_loads(await response.read())
                     jobs = data.get('jobs', []) if data.get('success') else []
+                    self._parse_job_contents(jobs)
                     
-                    if jobs and self.logger.isEnabledFor(logging.INFO):
-                        self.logger.info(f"📋 {len(jobs)} trabajos para {printer_name}")
-                        if self.logger.isEnabledFor(logging.DEBUG):
+                    if jobs and self._info:
+                        self.logger.info("📋 %s trabajos para %s", len(jobs), printer_name)
+                        if self._dbg:
                             for i, job in enumerate(jobs):
                                 job_id = job.get('id', 'SIN_ID')
                                 ref = job.get('tracking_number', job.get('order_name', 'SIN_REF'))
-                                self.logger.debug(f"   📄 {i+1}: #{job_id} - {ref}")
+                                self.logger.debug("   📄 %s: #%s - %s", i+1, job_id, ref)
                     
                     return jobs
                 elif response.status == 401:
-                    if self.logger.isEnabledFor(logging.WARNING):
-                        self.logger.warning(f"🔑 Token inválido: {printer_name}")
+                    if self._warn:
+                        self.logger.warning("🔑 Token inválido: %s", printer_name)
                     return []
                 else:
-                    if self.logger.isEnabledFor(logging.WARNING):
-                        self.logger.warning(f"🌐 HTTP {response.status}: {printer_name}")
+                    if self._warn:
+                        self.logger.warning("🌐 HTTP %s: %s", response.status, printer_name)
                     return []
                     
         except asyncio.TimeoutError:
-            if self.logger.isEnabledFor(logging.WARNING):
-                self.logger.warning(f"⏱️  Timeout Odoo: {printer_name}")
+            if self._warn:
+                self.logger.warning("⏱️  Timeout Odoo: %s", printer_name)
             return []
         except Exception as e:
-            self.logger.error(f"❌ Error obteniendo trabajos {printer_name}: {e}")
+            self.logger.error("❌ Error obteniendo trabajos %s: %s", printer_name, e)
             self.stats['total_errors'] += 1
             return []
     
-    async def update_job_status(self, session: aiohttp.ClientSession, job_id: int, token: str, status: str) -> bool:
+    async def get_jobs_batch(self) -> Dict[str, List[Dict]]:
+        """Obtiene trabajos de todas las impresoras en una sola llamada a Odoo"""
+        tokens = list(self.printers.keys())
+        if not tokens:
+            return {}
+
+        if self._supports_batch:
+            try:
+                url = f"{self.odoo_url}/api/pos_virtual_print/jobs_batch"
+
+                async with self._session.post(
+                    url,
+                    json={"tokens": tokens},
+                    timeout=aiohttp.ClientTimeout(total=10)
+                ) as response:
+
+                    if response.status == 200:
+                        data = _json_loads(await response.read())
+                        jobs_by_token = data.get('jobs', {}) if data.get('success') else {}
+                        return {t: self._parse_job_contents(jobs_by_token.get(t, []))
+                                for t in tokens}
+                    elif response.status == 404:
+                        # Servidor sin endpoint batch: recordar y caer a consultas individuales
+                        self._supports_batch = False
+                        if self._info:
+                            self.logger.info("🌐 Endpoint batch no disponible, usando consultas por impresora")
+                    else:
+                        if self._warn:
+                            self.logger.warning("🌐 HTTP %s en consulta batch", response.status)
+                        return {}
+
+            except asyncio.TimeoutError:
+                if self._warn:
+                    self.logger.warning("⏱️  Timeout Odoo en consulta batch")
+                return {}
+            except Exception as e:
+                self.logger.error("❌ Error en consulta batch: %s", e)
+                self.stats['total_errors'] += 1
+                return {}
+
+        # Fallback: consultas concurrentes por impresora sobre el pool compartido
+        results = await asyncio.gather(
+            *(self.get_jobs_from_odoo(t) for t in tokens),
+            return_exceptions=True
+        )
+        return {t: (r if isinstance(r, list) else []) for t, r in zip(tokens, results)}
+
+    async def update_job_status(self, job_id: int, token: str, status: str,
+                                attempt_token: Optional[str] = None) -> bool:
         """Actualiza estado con logging mínimo"""
-        if self.logger.isEnabledFor(logging.DEBUG):
-            printer_name = next((p.name for p in self.printers.values() if p.token == token), token[:8])
-            self.logger.debug(f"📤 Actualizando #{job_id} a '{status}' - {printer_name}")
+        if self._dbg:
+            printer_name = self._token_to_name.get(token, token[:8])
+            self.logger.debug("📤 Actualizando #%s a '%s' - %s", job_id, status, printer_name)
         
         try:
             url = f"{self.odoo_url}/api/pos_virtual_print/update_job"
             payload = {"job_id": job_id, "status": status, "token": token}
+            if attempt_token:
+                payload["attempt_token"] = attempt_token
             
-            async with session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=8)) as response:
+            async with self._session.post(url, json=payload, timeout=aiohttp.ClientTimeout(total=8)) as response:
                 success = response.status == 200
                 
-                if not success and self.logger.isEnabledFor(logging.WARNING):
-                    self.logger.warning(f"⚠️  HTTP {response.status} actualizando #{job_id}")
+                if not success and self._warn:
+                    self.logger.warning("⚠️  HTTP %s actualizando #%s", response.status, job_id)
                 
                 return success
                 
         except Exception as e:
-            if self.logger.isEnabledFor(logging.ERROR):
-                self.logger.error(f"❌ Error actualizando #{job_id}: {e}")
+            if self._err:
+                self.logger.error("❌ Error actualizando #%s: %s", job_id, e)
             self.stats['total_errors'] += 1
             return False
     
-    def print_job_sync(self, printer_config: PrinterConfig, job_data: Dict) -> bool:
-        """Imprime con logging eficiente"""
+    def _cut(self, printer: Dummy, printer_config: PrinterConfig):
+        """Corte directo según el modo configurado, sin cascada de try/except.
+
+        El render va contra un buffer Dummy que nunca lanza: la cascada
+        anterior jamás podía detectar capacidades reales de la impresora.
+        """
+        mode = printer_config.cut_mode
+        if mode == 'NONE':
+            # Impresora sin cortador: avance de papel manual
+            printer.text("\n\n\n\n")
+        elif mode:
+            printer.cut(mode=mode)
+        else:
+            printer.cut(mode='FULL')
+
+    def render_job(self, content: Dict, job_id: int, printer_config: PrinterConfig) -> Optional[bytes]:
+        """Renderiza el ticket ESC/POS a bytes una sola vez, sin tocar la red"""
+        buffer = RenderBuffer()
+        job_type = content.get('job_type', 'preparation')
+
+        if self._dbg:
+            self.logger.debug("📋 Tipo: %s", job_type)
+
+        if job_type == 'receipt':
+            ok = self._print_receipt(buffer, content, job_id, printer_config)
+        else:
+            ok = self._print_preparation(buffer, content, job_id, printer_config)
+
+        return buffer.output if ok else None
+
+    def _print_once(self, printer_config: PrinterConfig, job_data: Dict, payload: bytes) -> bool:
+        """Un único intento de envío del payload ya renderizado"""
+        job_id = job_data.get('id', 0)
+        tracking_number = job_data.get('tracking_number', job_data.get('order_name', f"#{job_id}"))
+
+        # Modo simulación: el render ya ocurrió; no tocar el socket
+        if printer_config.dry_run:
+            if self._info:
+                self.logger.info("🧪 DRY-RUN: #%s - %s (%s bytes, no enviado)",
+                                 job_id, tracking_number, len(payload))
+            return True
+
+        try:
+            connection_start = time.time()
+            printer = self.get_printer_connection(printer_config)
+
+            if not printer:
+                return False
+
+            # El envío completo va bajo el lock de la impresora: el pool es
+            # multithread y dos trabajos no pueden intercalar bytes en el socket
+            lock = self._conn_locks.setdefault(printer_config.token, threading.Lock())
+            with lock:
+                printer._raw(payload)
+            total_time = time.time() - connection_start
+
+            # Actualizar estadísticas
+            status = self.printer_status[printer_config.token]
+            status.last_job_printed = datetime.now()
+            status.last_job_printed_mono = time.monotonic()
+            status.total_jobs_printed += 1
+            self.update_printer_status(printer_config.token, True)
+
+            if self._info:
+                self.logger.info("✅ IMPRESO: #%s - %s (%.2fs)", job_id, tracking_number, total_time)
+
+            return True
+
+        except Exception as e:
+            self._drop_printer_connection(printer_config.token)
+            if self._warn:
+                self.logger.warning("⚠️  Error imprimiendo #%s: %s", job_id, e)
+            return False
+
+    async def print_job_with_retry(self, printer_config: PrinterConfig, job_data: Dict) -> bool:
+        """Imprime con reintentos en la capa asyncio: el worker sólo hace un intento
+        y el backoff entre intentos no bloquea ningún thread del pool"""
         job_id = job_data.get('id', 0)
         tracking_number = job_data.get('tracking_number', job_data.get('order_name', f"#{job_id}"))
         max_attempts = 3
-        
-        if self.logger.isEnabledFor(logging.INFO):
-            self.logger.info(f"🖨️  Imprimiendo #{job_id} - {tracking_number} en {printer_config.name}")
-        
+
+        if self._info:
+            self.logger.info("🖨️  Imprimiendo #%s - %s en %s", job_id, tracking_number, printer_config.name)
+
+        # Contenido ya viene parseado desde get_jobs_from_odoo; el
+        # isinstance queda como red de seguridad para trabajos re-encolados
+        content = job_data.get('content', {})
+        if isinstance(content, str):
+            content = _json_loads(content)
+
+        loop = asyncio.get_running_loop()
+
+        # Renderizar una sola vez: los reintentos reenvían los mismos bytes.
+        # El renderizado (formateo ESC/POS puro-CPU) va al pool de threads
+        # para que un ticket grande no congele el event loop
+        try:
+            payload = await loop.run_in_executor(
+                self.print_executor, self.render_job, content, job_id, printer_config)
+        except Exception as e:
+            self.logger.error("❌ Error renderizando #%s: %s", job_id, e)
+            payload = None
+
+        if not payload:
+            self.logger.error("❌ FALLO FINAL imprimiendo #%s", job_id)
+            self.stats['jobs_failed'] += 1
+            return False
+
         for attempt in range(max_attempts):
-            if self.logger.isEnabledFor(logging.DEBUG):
-                self.logger.debug(f"🔄 Intento {attempt + 1}/{max_attempts}")
-            
-            try:
-                connection_start = time.time()
-                printer = self.create_printer_connection(printer_config)
-                
-                if not printer:
-                    if attempt < max_attempts - 1:
-                        if self.logger.isEnabledFor(logging.WARNING):
-                            self.logger.warning(f"⚠️  Intento {attempt + 1} falló, reintentando...")
-                        time.sleep(printer_config.retry_delay)
-                        continue
-                    else:
-                        self.logger.error(f"❌ Sin conexión tras {max_attempts} intentos")
-                        self.stats['jobs_failed'] += 1
-                        return False
-                
-                # Procesar contenido
-                content = job_data.get('content', {})
-                if isinstance(content, str):
-                    content = json.loads(content)
-                
-                job_type = content.get('job_type', 'preparation')
-                
-                if self.logger.isEnabledFor(logging.DEBUG):
-                    self.logger.debug(f"📋 Tipo: {job_type}")
-                
-                # Imprimir según tipo
-                if job_type == 'receipt':
-                    success = self._print_receipt(printer, content, job_id, printer_config)
-                else:
-                    success = self._print_preparation(printer, content, job_id, printer_config)
-                
-                total_time = time.time() - connection_start
-                
-                # Cerrar conexión
-                try:
-                    printer.close()
-                except:
-                    pass
-                
-                if success:
-                    # Actualizar estadísticas
-                    status = self.printer_status[printer_config.token]
-                    status.last_job_printed = datetime.now()
-                    status.total_jobs_printed += 1
-                    self.update_printer_status(printer_config.token, True)
-                    
-                    if self.logger.isEnabledFor(logging.INFO):
-                        self.logger.info(f"✅ IMPRESO: #{job_id} - {tracking_number} ({total_time:.2f}s)")
-                    
-                    return True
-                else:
-                    if attempt < max_attempts - 1:
-                        if self.logger.isEnabledFor(logging.WARNING):
-                            self.logger.warning(f"⚠️  Impresión falló, reintentando...")
-                        time.sleep(printer_config.retry_delay)
-                        continue
-                    else:
-                        self.logger.error(f"❌ FALLO FINAL imprimiendo #{job_id}")
-                        self.update_printer_status(printer_config.token, False, "Error impresión")
-                        self.stats['jobs_failed'] += 1
-                        return False
-                
-            except Exception as e:
-                if attempt < max_attempts - 1:
-                    if self.logger.isEnabledFor(logging.WARNING):
-                        self.logger.warning(f"⚠️  Error intento {attempt + 1}: {e}")
-                    time.sleep(printer_config.retry_delay)
-                    continue
-                else:
-                    self.logger.error(f"❌ ERROR FINAL #{job_id}: {e}")
-                    self.update_printer_status(printer_config.token, False, str(e))
-                    self.stats['jobs_failed'] += 1
-                    return False
-        
+            # Fail-fast en apagado: no quemar reintentos con el servicio cayendo
+            if self.killer.kill_now:
+                return False
+
+            if self._dbg:
+                self.logger.debug("🔄 Intento %s/%s", attempt + 1, max_attempts)
+
+            async with self._print_sem:
+                success = await loop.run_in_executor(
+                    self.print_executor,
+                    self._print_once,
+                    printer_config,
+                    job_data,
+                    payload
+                )
+
+            if success:
+                if printer_config.post_print_settle > 0:
+                    await asyncio.sleep(printer_config.post_print_settle)
+                return True
+
+            if attempt < max_attempts - 1:
+                if self._warn:
+                    self.logger.warning("⚠️  Intento %s falló, reintentando...", attempt + 1)
+                # Backoff exponencial con jitter: evita martillar una impresora
+                # caída y desincroniza reintentos paralelos
+                delay = min(
+                    printer_config.retry_delay * (2 ** attempt)
+                    + random.random() * printer_config.retry_delay,
+                    MAX_BACKOFF
+                )
+                await asyncio.sleep(delay)
+
+        self.logger.error("❌ FALLO FINAL imprimiendo #%s", job_id)
+        self.update_printer_status(printer_config.token, False, "Error impresión")
+        self.stats['jobs_failed'] += 1
         return False
 
-    def _print_preparation(self, printer: Network, content: Dict, job_id: int, printer_config: PrinterConfig) -> bool:
+
+    def _print_preparation(self, printer: Dummy, content: Dict, job_id: int, printer_config: PrinterConfig) -> bool:
         """Imprime comanda con logging eficiente"""
-        if self.logger.isEnabledFor(logging.DEBUG):
+        if self._dbg:
             self.logger.debug(f"📄 Imprimiendo comanda #{job_id}")
         
         try:
+            # Timestamp único por comanda (strftime hace lookups de locale)
+            now = datetime.now()
+            ts_full = now.strftime('%d/%m/%Y %H:%M:%S')
+            ts_short = now.strftime('%H:%M:%S')
+
             # Encabezado
             printer.set(align='center', width=2, height=2, bold=True)
             printer.text("=== COMANDA ===\n")
@@ -743,7 +1184,7 @@ class AsyncClient:
             printer.text(f"ORDEN: {tracking_number} |  CONTROL#{job_id}\n")
             
             printer.set(align='left', bold=False)
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             
             # Detalles de orden
             order_name = content.get('order_name', 'N/A')
@@ -761,59 +1202,44 @@ class AsyncClient:
             if customer and customer != 'Cliente General':
                 printer.text(f"Cliente: {customer[:40]}\n")
             
-            printer.text(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+            printer.text(f"Fecha: {ts_full}\n")
             
             # Nota general del pedido
             order_note = content.get('note', content.get('order_note', content.get('special_instructions', '')))
             if order_note:
-                printer.text("-" * 48 + "\n")
+                printer.text(SEP_DASH)
                 printer.set(bold=True)
                 printer.text("NOTA ESPECIAL:\n")
                 printer.set(bold=False)
                 
-                # Dividir nota en líneas de máximo 46 caracteres
-                note_lines = []
-                words = order_note.split()
-                current_line = ""
-                
-                for word in words:
-                    if len(current_line + " " + word) <= 46:
-                        current_line += (" " if current_line else "") + word
-                    else:
-                        if current_line:
-                            note_lines.append(current_line)
-                        current_line = word
-                
-                if current_line:
-                    note_lines.append(current_line)
-                
-                # Imprimir máximo 3 líneas de nota
-                for i, line in enumerate(note_lines[:3]):
+                # Máximo 3 líneas de 46 caracteres; textwrap corta en C-regex
+                # en vez de concatenar strings palabra por palabra
+                note_lines = wrap(order_note, width=46, max_lines=3,
+                                  placeholder=' ...(continúa)')
+                for line in note_lines:
                     printer.text(f"{line}\n")
-                
-                if len(note_lines) > 3:
-                    printer.text("...(continúa)\n")
             
-            printer.text("-" * 48 + "\n")
+            printer.text(SEP_DASH)
             
-            # Verificar tipo de orden
+            # Verificar tipo de orden (lines se consulta una sola vez y se
+            # reusa en el loop de productos)
+            lines = content.get('lines', [])
             is_cancellation = content.get('is_cancellation', False)
-            has_modifications = any(line.get('is_modified', False) for line in content.get('lines', []))
+            has_modifications = any(map(_GET_IS_MODIFIED, lines))
             
             if is_cancellation:
                 printer.set(align='center', bold=True)
                 printer.text("*** ORDEN CANCELADA ***\n")
                 printer.set(align='left', bold=False)
-                printer.text("-" * 48 + "\n")
+                printer.text(SEP_DASH)
             elif has_modifications:
                 printer.set(align='center', bold=True)
                 printer.text("*** MODIFICACIONES ***\n")
                 printer.set(align='left', bold=False)
-                printer.text("-" * 48 + "\n")
+                printer.text(SEP_DASH)
             
             # Productos
-            lines = content.get('lines', [])
-            if self.logger.isEnabledFor(logging.DEBUG):
+            if self._dbg:
                 self.logger.debug(f"📋 Imprimiendo {len(lines)} líneas")
             
             for line in lines:
@@ -863,36 +1289,25 @@ class AsyncClient:
                 printer.text("\n")
             
             # Pie
-            printer.text("-" * 48 + "\n")
+            printer.text(SEP_DASH)
             printer.set(align='center')
-            printer.text(f"Impreso: {datetime.now().strftime('%H:%M:%S')}\n")
+            printer.text(f"Impreso: {ts_short}\n")
             printer.text(f"Estacion: {printer_config.name[:30]}\n")
             
             # Cortar papel
-            try:
-                printer.cut(mode='FULL')
-            except:
-                try:
-                    printer.cut(mode='PART')
-                except:
-                    try:
-                        printer.cut()
-                    except:
-                        printer.text("\n\n\n\n")
-            
-            time.sleep(0.3)
-            if self.logger.isEnabledFor(logging.DEBUG):
+            self._cut(printer, printer_config)
+            
+            if self._dbg:
                 self.logger.debug(f"✅ Comanda #{job_id} completada")
             return True
         
         except Exception as e:
-            if self.logger.isEnabledFor(logging.ERROR):
-                self.logger.error(f"❌ Error comanda #{job_id}: {e}")
+            self.logger.error("❌ Error comanda #%s: %s", job_id, e)
             return False
         
-    def _print_receipt(self, printer: Network, content: Dict, job_id: int, printer_config: PrinterConfig) -> bool:
+    def _print_receipt(self, printer: Dummy, content: Dict, job_id: int, printer_config: PrinterConfig) -> bool:
         """Imprime recibo con detección automática de tipo (normal vs parque)"""
-        if self.logger.isEnabledFor(logging.DEBUG):
+        if self._dbg:
             self.logger.debug(f"🧾 Analizando tipo de recibo #{job_id}")
         
         try:
@@ -905,24 +1320,28 @@ class AsyncClient:
             )
             
             if is_playground:
-                if self.logger.isEnabledFor(logging.INFO):
+                if self._info:
                     self.logger.info(f"🎮 Detectado recibo de parque #{job_id}")
                 return self._print_playground_receipt(printer, content, job_id, printer_config)
             else:
-                if self.logger.isEnabledFor(logging.DEBUG):
+                if self._dbg:
                     self.logger.debug(f"🧾 Recibo normal #{job_id}")
                 return self._print_regular_receipt(printer, content, job_id, printer_config)
                 
         except Exception as e:
-            self.logger.error(f"❌ Error general recibo #{job_id}: {e}")
+            self.logger.error("❌ Error general recibo #%s: %s", job_id, e)
             return False
 
-    def _print_playground_receipt(self, printer: Network, content: Dict, job_id: int, printer_config: PrinterConfig) -> bool:
+    def _print_playground_receipt(self, printer: Dummy, content: Dict, job_id: int, printer_config: PrinterConfig) -> bool:
         """Imprime recibo específico para parque infantil con códigos de barras - CÓDIGO39 PRIORITARIO"""
-        if self.logger.isEnabledFor(logging.INFO):
+        if self._info:
             self.logger.info(f"🎮 Imprimiendo recibo de parque #{job_id}")
         
         try:
+            now = datetime.now()
+            ts_full = now.strftime('%d/%m/%Y %H:%M:%S')
+            ts_short = now.strftime('%d/%m/%Y %H:%M')
+
             company_name = content.get('company_name', 'PARQUE INFANTIL')
             tracking_number = content.get('tracking_number', content.get('order_name', 'N/A'))
             
@@ -931,7 +1350,7 @@ class AsyncClient:
             printer.text(f"{company_name}\n")
             
             printer.set(align='center', width=1, height=1, bold=False)
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             
             # ========== INFORMACIÓN DE LA ORDEN ==========
             printer.set(align='left', bold=True)
@@ -939,7 +1358,7 @@ class AsyncClient:
             printer.set(bold=False)
             
             # Fecha y hora
-            order_date = content.get('datetime', datetime.now().strftime('%d/%m/%Y %H:%M'))
+            order_date = content.get('datetime', ts_short)
             printer.text(f"Fecha: {order_date}\n")
             
             # Información adicional
@@ -955,7 +1374,7 @@ class AsyncClient:
             if customer != 'Cliente General':
                 printer.text(f"Cliente: {customer[:40]}\n")
             
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             
             # ========== CÓDIGOS DE PARQUE CON CÓDIGO DE BARRAS ==========
             playground_codes = content.get('playground_codes', [])
@@ -965,7 +1384,7 @@ class AsyncClient:
                 printer.set(align='center', bold=True, width=1, height=2)
                 printer.text("🎮 ENTRADAS PARQUE INFANTIL 🎮\n")
                 printer.set(align='left', bold=False, width=1, height=1)
-                printer.text("=" * 48 + "\n")
+                printer.text(SEP_EQ)
                 
                 for i, code_data in enumerate(playground_codes, 1):
                     product_name = code_data.get('product_name', 'Entrada Parque')
@@ -981,7 +1400,7 @@ class AsyncClient:
                     printer.set(bold=False)
                     printer.text(f"Cantidad: {qty} | Duración: {duration} min\n")
                     printer.text(f"Precio: Bs.{price:.2f}\n")
-                    printer.text("-" * 48 + "\n")
+                    printer.text(SEP_DASH)
                     
                     # ===== CÓDIGO DE BARRAS - CODE39 PRIORITARIO =====
                     if code:
@@ -1037,19 +1456,19 @@ class AsyncClient:
                         
                         # FALLBACK VISUAL MEJORADO (solo si TODO falla)
                         if not barcode_success:
-                            self.logger.error(f"❌ TODOS los códigos de barras fallaron para: {code}")
+                            self.logger.error("❌ TODOS los códigos de barras fallaron para: %s", code)
                             
                             # Crear "código de barras" visual con asteriscos
-                            printer.text("*" * 48 + "\n")
+                            printer.text(SEP_STAR)
                             printer.set(width=2, height=2, bold=True)
                             printer.text(f"  {code}  \n")
                             printer.set(width=1, height=1, bold=False)
-                            printer.text("*" * 48 + "\n")
+                            printer.text(SEP_STAR)
                             printer.text("** ESCANEAR CÓDIGO MANUAL **\n")
-                            printer.text("*" * 48 + "\n")
+                            printer.text(SEP_STAR)
                             
                             # Log para debugging
-                            self.logger.error(f"💥 FALLBACK VISUAL USADO para código: {code}")
+                            self.logger.error("💥 FALLBACK VISUAL USADO para código: %s", code)
                         else:
                             # Log de éxito
                             self.logger.info(f"🎯 CÓDIGO DE BARRAS IMPRESO EXITOSAMENTE: {code}")
@@ -1071,7 +1490,7 @@ class AsyncClient:
                             self.logger.debug(f"ℹ️ QR no soportado (normal): {qr_error}")
                         
                         printer.set(align='left')
-                        printer.text("=" * 48 + "\n")
+                        printer.text(SEP_EQ)
                         
                         # ===== INSTRUCCIONES DE USO =====
                         printer.set(align='center', bold=True)
@@ -1091,7 +1510,7 @@ class AsyncClient:
                         printer.text("Contacte al personal\n")
                         printer.set(align='left', bold=False)
                     
-                    printer.text("=" * 48 + "\n")
+                    printer.text(SEP_EQ)
             
             # ========== PRODUCTOS REGULARES (SI LOS HAY) ==========
             regular_lines = content.get('regular_lines', [])
@@ -1099,27 +1518,24 @@ class AsyncClient:
             
             if regular_lines:
                 printer.text("OTROS PRODUCTOS:\n")
-                printer.text("-" * 48 + "\n")
+                printer.text(SEP_DASH)
                 printer.set(bold=True)
                 printer.text("CANT DESCRIPCION           PRECIO     SUBTOTAL\n")
                 printer.set(bold=False)
-                printer.text("-" * 48 + "\n")
+                printer.text(SEP_DASH)
                 
                 for line in regular_lines:
-                    name = line.get('product_name', line.get('name', 'Producto'))[:20].ljust(20)
+                    name = line.get('product_name', line.get('name', 'Producto'))
                     qty = int(line.get('qty', 1))
                     price = float(line.get('price_unit', 0))
                     subtotal = float(line.get('price_subtotal', 0))
                     total_regular += subtotal
-                    
-                    qty_str = f"{qty:>3}"
-                    price_str = f"Bs.{price:>6.2f}"
-                    subtotal_str = f"Bs.{subtotal:>8.2f}"
-                    
-                    printer.text(f"{qty_str} {name} {price_str} {subtotal_str}\n")
+
+                    # :<20.20 trunca y rellena en una sola op de formato C-level
+                    printer.text(f"{qty:>3} {name:<20.20} Bs.{price:>6.2f} Bs.{subtotal:>8.2f}\n")
             
             # ========== TOTALES ==========
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             
             total_final = total_playground + total_regular
             
@@ -1129,11 +1545,11 @@ class AsyncClient:
                 printer.text(f"{'Subtotal Otros:':<32} Bs.{total_regular:>11.2f}\n")
             
             # Total final destacado
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             printer.set(bold=True, width=1, height=2)
             printer.text(f"{'TOTAL:':<24} Bs.{total_final:>11.2f}\n")
             printer.set(bold=False, width=1, height=1)
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             
             # ========== INFORMACIÓN DE PAGO ==========
             payments = content.get('payments', [])
@@ -1170,7 +1586,7 @@ class AsyncClient:
             cashier = content.get('server', 'Sistema')
             printer.text(f"Cajero: {cashier}\n")
             printer.text(f"Terminal: {printer_config.name[:30]}\n")
-            printer.text(f"Impreso: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+            printer.text(f"Impreso: {ts_full}\n")
             
             # Información adicional del establecimiento
             printer.text("\n")
@@ -1179,43 +1595,34 @@ class AsyncClient:
             
             # ========== CORTAR PAPEL ==========
             printer.text("\n")
-            try:
-                printer.cut(mode='FULL')
-            except Exception:
-                try:
-                    printer.cut(mode='PART')
-                except Exception:
-                    try:
-                        printer.cut()
-                    except Exception:
-                        # Si no puede cortar, espacios extra
-                        printer.text("\n\n\n\n")
-            
-            # Pausa para estabilizar impresora
-            time.sleep(0.5)
+            self._cut(printer, printer_config)
             
             # Log final exitoso
             codes_count = len(playground_codes)
-            if self.logger.isEnabledFor(logging.INFO):
+            if self._info:
                 self.logger.info(f"✅ Recibo parque #{job_id} completado - "
                             f"{codes_count} códigos, Total: Bs.{total_final:.2f}")
             
             return True
             
         except Exception as e:
-            self.logger.error(f"❌ Error recibo parque #{job_id}: {e}")
-            if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.error("❌ Error recibo parque #%s: %s", job_id, e)
+            if self._dbg:
                 self.logger.exception("Stack trace completo:")
             return False
 
-    def _print_regular_receipt(self, printer: Network, content: Dict, job_id: int, printer_config: PrinterConfig) -> bool:
+    def _print_regular_receipt(self, printer: Dummy, content: Dict, job_id: int, printer_config: PrinterConfig) -> bool:
         """Imprime recibo regular (sin códigos de barras) - CÓDIGO ORIGINAL CONSERVADO"""
-        if self.logger.isEnabledFor(logging.DEBUG):
+        if self._dbg:
             self.logger.debug(f"🧾 Imprimiendo recibo regular #{job_id}")
         
         try:
+            now = datetime.now()
+            ts_full = now.strftime('%d/%m/%Y %H:%M:%S')
+            ts_short = now.strftime('%d/%m/%Y %H:%M')
+
             company_name = content.get('company_name', 'EMPRESA')
-            tracking_number = content.get('tracking_number', content.get('order_name', 'N/A'))
+            tracking_number = _first(content, TRACKING_KEYS, 'N/A')
             
             # Encabezado empresa
             printer.set(align='center', width=2, height=2, bold=True)
@@ -1231,10 +1638,10 @@ class AsyncClient:
                 if company_info.get('email'):
                     printer.text(f"{company_info['email']}\n")
                 if company_info.get('vat') or company_info.get('rfc'):
-                    vat = company_info.get('vat', company_info.get('rfc', ''))
+                    vat = company_info.get('vat') or company_info.get('rfc', '')
                     printer.text(f"RFC: {vat}\n")
             
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             
             # Información de la orden
             printer.set(align='left', bold=True)
@@ -1242,15 +1649,15 @@ class AsyncClient:
             printer.set(bold=False)
             
             # Fecha y hora
-            order_date = content.get('order_date', content.get('date_order', ''))
+            order_date = _first(content, DATE_KEYS, '')
             if not order_date:
-                order_date = datetime.now().strftime('%d/%m/%Y %H:%M')
+                order_date = ts_short
             printer.text(f"Fecha: {order_date}\n")
             
             # Información adicional - Mejor formato
-            table = content.get('table', content.get('table_name', 'N/A'))
-            server = content.get('server', content.get('user_name', content.get('cashier', 'N/A')))
-            customer = content.get('customer', content.get('partner_name', content.get('client_name', '')))
+            table = _first(content, TABLE_KEYS, 'N/A')
+            server = _first(content, SERVER_KEYS, 'N/A')
+            customer = _first(content, CUSTOMER_KEYS, '')
             
             # Mesa y mesero en líneas separadas si es muy largo
             mesa_mesero = f"Mesa: {table} | Mesero: {server}"
@@ -1265,18 +1672,20 @@ class AsyncClient:
                 customer_line = f"Cliente: {customer[:40]}"
                 printer.text(f"{customer_line}\n")
             
-            printer.text("-" * 48 + "\n")
+            printer.text(SEP_DASH)
             
             # Encabezado de productos con mejor alineación
             printer.set(bold=True)
             printer.text("CANT DESCRIPCION           PRECIO     SUBTOTAL\n")
             printer.set(bold=False)
-            printer.text("-" * 48 + "\n")
+            printer.text(SEP_DASH)
             
-            # Productos con formato mejorado
-            lines = content.get('lines', content.get('order_lines', content.get('products', [])))
+            # Productos con formato mejorado: cada línea es un único f-string
+            # acumulado en una lista y el cuerpo entero se emite en un text()
+            lines = _first(content, LINES_KEYS) or []
             total = 0
             line_count = 0
+            parts = []
             
             for line in lines:
                 try:
@@ -1296,34 +1705,29 @@ class AsyncClient:
                     # Espacios: 4 + 20 + 10 + 14 = 48
                     qty_str = f"{qty:>3.0f}" if qty == int(qty) else f"{qty:>3.1f}"
                     
-                    # Truncar nombre a 20 caracteres
-                    name_str = name[:20].ljust(20)
-                    
-                    price_str = f"Bs.{price:>6.2f}"
-                    subtotal_str = f"Bs.{subtotal:>8.2f}"
-                    
-                    # Línea principal del producto
-                    printer.text(f"{qty_str} {name_str} {price_str} {subtotal_str}\n")
+                    # Línea principal del producto (:<20.20 trunca y alinea en un solo op)
+                    parts.append(f"{qty_str} {name:<20.20} Bs.{price:>6.2f} Bs.{subtotal:>8.2f}\n")
                     
                     # Si el nombre era muy largo, mostrar resto en línea siguiente
                     if len(name) > 20:
-                        remaining_name = name[20:60]  # Máximo 40 chars adicionales
-                        printer.text(f"    {remaining_name}\n")
+                        parts.append(f"    {name[20:60]}\n")  # Máximo 40 chars adicionales
                     
                     # Nota si existe
                     note = line.get('note', line.get('description', ''))
                     if note and note != name:
-                        note_lines = [note[i:i+44] for i in range(0, len(note), 44)]
-                        for note_line in note_lines[:2]:  # Máximo 2 líneas de nota
-                            printer.text(f"    Nota: {note_line}\n")
+                        for note_line in wrap(note, 44)[:2]:  # Máximo 2 líneas de nota
+                            parts.append(f"    Nota: {note_line}\n")
                     
                 except (ValueError, TypeError) as e:
-                    if self.logger.isEnabledFor(logging.WARNING):
+                    if self._warn:
                         self.logger.warning(f"⚠️ Error procesando línea: {e}")
                     continue
             
+            if parts:
+                printer.text("".join(parts))
+            
             # Separador antes de totales
-            printer.text("-" * 48 + "\n")
+            printer.text(SEP_DASH)
             
             # Cálculo de impuestos
             tax_included = content.get('tax_included', True)
@@ -1350,11 +1754,11 @@ class AsyncClient:
                 total -= discount
             
             # Total final
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             printer.set(bold=True, width=1, height=1)
             printer.text(f"{'TOTAL:':<32} Bs.{total:>11.2f}\n")
             printer.set(bold=False, width=1, height=1)
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             
             # Información de pago mejorada
             payment_methods = []
@@ -1369,7 +1773,7 @@ class AsyncClient:
                 payment_methods.append(payment_method)
             
             # Buscar en payments si existe
-            payments = content.get('payments', content.get('payment_lines', []))
+            payments = _first(content, PAYMENTS_KEYS) or []
             if payments:
                 for payment in payments:
                     method = (payment.get('journal_name') or 
@@ -1389,7 +1793,7 @@ class AsyncClient:
                 printer.text(f"  {method}\n")
             
             # Cálculo de cambio solo para efectivo
-            if any('efectivo' in method.lower() or 'cash' in method.lower() for method in payment_methods):
+            if any(_CASH_RE.search(method) for method in payment_methods):
                 amount_paid = float(content.get('amount_paid', content.get('received_amount', total)))
                 if amount_paid > total:
                     change = amount_paid - total
@@ -1408,10 +1812,10 @@ class AsyncClient:
             printer.text("¡GRACIAS POR SU COMPRA!\n")
             
             # Información del terminal
-            cashier = content.get('cashier', content.get('user_name', content.get('server', 'Sistema')))
+            cashier = _first(content, CASHIER_KEYS, 'Sistema')
             printer.text(f"Cajero: {cashier}\n")
             printer.text(f"Terminal: {printer_config.name[:30]}\n")
-            printer.text(f"Impreso: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+            printer.text(f"Impreso: {ts_full}\n")
             
             # Información fiscal
             fiscal_info = content.get('fiscal_info', {})
@@ -1424,83 +1828,90 @@ class AsyncClient:
             
             # Cortar papel
             printer.text("\n")
-            try:
-                printer.cut(mode='FULL')
-            except Exception:
-                try:
-                    printer.cut(mode='PART')
-                except Exception:
-                    try:
-                        printer.cut()
-                    except Exception:
-                        printer.text("\n\n\n\n")
+            self._cut(printer, printer_config)
             
-            time.sleep(0.3)
-            
-            if self.logger.isEnabledFor(logging.INFO):
+            if self._info:
                 self.logger.info(f"✅ Recibo regular #{job_id} - {line_count} productos, Total: Bs.{total:.2f}")
             
             return True
             
         except Exception as e:
-            self.logger.error(f"❌ Error recibo regular #{job_id}: {e}")
+            self.logger.error("❌ Error recibo regular #%s: %s", job_id, e)
             return False
 
-    async def process_printer_jobs(self, session: aiohttp.ClientSession, token: str) -> int:
+    async def process_printer_jobs(self, token: str, jobs: Optional[List[Dict]] = None) -> int:
         """Procesa trabajos de una impresora"""
-        jobs = await self.get_jobs_from_odoo(session, token)
+        if jobs is None:
+            jobs = await self.get_jobs_from_odoo(token)
         if not jobs:
             return 0
         
         printer_config = self.printers[token]
+
+        # Fail-fast: con la impresora caída y el sondeo aún en backoff, no
+        # quemar retry_delay × max_attempts por trabajo; directo a reintentos
+        status = self.printer_status.get(token)
+        if status is not None and not status.is_healthy and time.monotonic() < status.next_probe_time:
+            for job in jobs:
+                job_id = job.get('id')
+                if job_id:
+                    await self.update_job_status(job_id, token, 'error')
+                    self.add_to_retry_queue(job_id, token, job)
+            if self._dbg:
+                self.logger.debug("⏭️  %s no saludable, %s trabajos a cola de reintentos",
+                                  printer_config.name, len(jobs))
+            return 0
+
         processed = 0
-        
+        # Pipeline: los update_job_status (HTTP) se lanzan como tareas y se
+        # solapan con la impresión del siguiente trabajo; la impresora en sí
+        # sigue recibiendo trabajos en serie
+        status_updates: List[asyncio.Task] = []
+
         for job in jobs:
             if self.killer.kill_now:
                 break
-            
+
             job_id = job.get('id')
             if not job_id:
                 continue
-            
+
             # Actualizar estado a "processing"
-            #await self.update_job_status(session, job_id, token, 'processing')
-            
-            # Imprimir en thread pool
-            loop = asyncio.get_event_loop()
-            success = await loop.run_in_executor(
-                self.print_executor,
-                self.print_job_sync,
-                printer_config,
-                job
-            )
-            
+            #await self.update_job_status(job_id, token, 'processing')
+
+            # Imprimir (reintentos gestionados en la capa asyncio)
+            success = await self.print_job_with_retry(printer_config, job)
+
             if success:
-                await self.update_job_status(session, job_id, token, 'done')
+                status_updates.append(asyncio.create_task(
+                    self.update_job_status(job_id, token, 'done')))
                 self.stats['jobs_processed'] += 1
                 processed += 1
-                
+
                 # Remover de cola de fallos si existía
                 if job_id in self.failed_jobs:
                     del self.failed_jobs[job_id]
-                    if self.logger.isEnabledFor(logging.INFO):
+                    if self._info:
                         self.logger.info(f"✅ Trabajo #{job_id} recuperado de cola de fallos")
             else:
-                await self.update_job_status(session, job_id, token, 'error')
+                status_updates.append(asyncio.create_task(
+                    self.update_job_status(job_id, token, 'error')))
                 self.add_to_retry_queue(job_id, token, job)
-            
+
             self.stats['last_activity'] = datetime.now()
-        
+
+        if status_updates:
+            await asyncio.gather(*status_updates)
+
         return processed
     
     def add_to_retry_queue(self, job_id: int, token: str, job_data: Dict):
         """Añade trabajo a cola de reintentos"""
         if len(self.failed_jobs) >= self.max_failed_jobs:
-            # Remover el más antiguo
-            oldest_job_id = min(self.failed_jobs.keys(), 
-                              key=lambda x: self.failed_jobs[x].last_attempt)
-            del self.failed_jobs[oldest_job_id]
-            if self.logger.isEnabledFor(logging.WARNING):
+            # Remover el más antiguo (cabeza del OrderedDict, O(1));
+            # su entrada en el heap queda obsoleta y se descarta al poparla
+            oldest_job_id, _ = self.failed_jobs.popitem(last=False)
+            if self._warn:
                 self.logger.warning(f"⚠️  Cola llena, removido trabajo #{oldest_job_id}")
         
         if job_id in self.failed_jobs:
@@ -1513,23 +1924,44 @@ class AsyncClient:
         delay_index = min(failed_job.attempts - 1, len(self.retry_intervals) - 1)
         delay_seconds = self.retry_intervals[delay_index]
         failed_job.next_retry = datetime.now() + timedelta(seconds=delay_seconds)
+        failed_job.next_retry_mono = time.monotonic() + delay_seconds
         failed_job.last_attempt = datetime.now()
         
         self.failed_jobs[job_id] = failed_job
+        heapq.heappush(self._retry_heap, (failed_job.next_retry_mono, job_id))
         
-        if self.logger.isEnabledFor(logging.WARNING):
+        if self._warn:
             self.logger.warning(f"⚠️  Trabajo #{job_id} en cola reintento #{failed_job.attempts} "
                               f"(próximo en {delay_seconds}s)")
     
-    async def process_retry_queue(self, session: aiohttp.ClientSession) -> int:
+    async def process_retry_queue(self) -> int:
         """Procesa cola de reintentos"""
-        now = datetime.now()
-        ready_jobs = [job for job in self.failed_jobs.values() if job.next_retry <= now]
-        
+        now_ts = time.monotonic()
+
+        # Fast-path O(1): sin cola, o la cabeza del heap aún no vence;
+        # corre cada check_interval así que el caso vacío debe ser gratis
+        if not self._retry_heap or self._retry_heap[0][0] > now_ts:
+            return 0
+
+        ready_jobs = []
+        while self._retry_heap and self._retry_heap[0][0] <= now_ts:
+            _, job_id = heapq.heappop(self._retry_heap)
+            failed_job = self.failed_jobs.get(job_id)
+            # Entradas obsoletas (trabajo resuelto o re-encolado con otro
+            # plazo): ignorar; la comparación usa el mismo reloj monotónico
+            # que la clave del heap para que un salto NTP no descarte trabajos
+            if failed_job is None or failed_job.next_retry_mono > now_ts:
+                continue
+            ready_jobs.append(failed_job)
+
         if not ready_jobs:
             return 0
+
+        # LIFO: reintentar primero el fallo más reciente reduce la latencia
+        # media de reintento cuando varios trabajos vencen en el mismo tick
+        ready_jobs.sort(key=lambda job: job.last_attempt, reverse=True)
         
-        if self.logger.isEnabledFor(logging.DEBUG):
+        if self._dbg:
             self.logger.debug(f"🔄 Procesando {len(ready_jobs)} reintentos")
         
         processed = 0
@@ -1543,38 +1975,32 @@ class AsyncClient:
             
             printer_config = self.printers[failed_job.printer_token]
             
-            if self.logger.isEnabledFor(logging.INFO):
+            if self._info:
                 self.logger.info(f"🔄 Reintentando trabajo #{failed_job.job_id} "
                                f"(intento {failed_job.attempts})")
             
             # Intentar imprimir
-            loop = asyncio.get_event_loop()
-            success = await loop.run_in_executor(
-                self.print_executor,
-                self.print_job_sync,
-                printer_config,
-                failed_job.job_data
-            )
+            success = await self.print_job_with_retry(printer_config, failed_job.job_data)
             
             if success:
-                await self.update_job_status(session, failed_job.job_id, 
-                                           failed_job.printer_token, 'done')
+                await self.update_job_status(failed_job.job_id,
+                                           failed_job.printer_token, 'done',
+                                           attempt_token=failed_job.attempt_token)
                 del self.failed_jobs[failed_job.job_id]
                 self.stats['jobs_processed'] += 1
                 self.stats['jobs_retried'] += 1
                 processed += 1
                 
-                if self.logger.isEnabledFor(logging.INFO):
+                if self._info:
                     self.logger.info(f"✅ Reintento exitoso: #{failed_job.job_id}")
             else:
                 # Si falla mucho, remover
                 if failed_job.attempts >= 5:
                     del self.failed_jobs[failed_job.job_id]
-                    await self.update_job_status(session, failed_job.job_id,
+                    await self.update_job_status(failed_job.job_id,
                                                failed_job.printer_token, 'error')
-                    if self.logger.isEnabledFor(logging.ERROR):
-                        self.logger.error(f"❌ Trabajo #{failed_job.job_id} "
-                                        f"descartado tras {failed_job.attempts} intentos")
+                    self.logger.error("❌ Trabajo #%s descartado tras %s intentos",
+                                      failed_job.job_id, failed_job.attempts)
                 else:
                     # Reagendar
                     self.add_to_retry_queue(failed_job.job_id, failed_job.printer_token, 
@@ -1587,7 +2013,7 @@ class AsyncClient:
         uptime = datetime.now() - self.stats['start_time']
         healthy_printers = len([p for p in self.printer_status.values() if p.is_healthy])
         
-        if self.logger.isEnabledFor(logging.INFO):
+        if self._info:
             self.logger.info(f"💗 Heartbeat - Uptime: {uptime}, "
                            f"Impresoras OK: {healthy_printers}/{len(self.printers)}, "
                            f"Trabajos: {self.stats['jobs_processed']}, "
@@ -1595,7 +2021,7 @@ class AsyncClient:
     
     def print_status_summary(self):
         """Resumen de estado con logging controlado"""
-        if not self.logger.isEnabledFor(logging.INFO):
+        if not self._info:
             return
         
         uptime = datetime.now() - self.stats['start_time']
@@ -1620,88 +2046,118 @@ class AsyncClient:
         self.logger.info(f"   📊 Impresoras saludables: {healthy_count}/{len(self.printers)}")
         self.logger.info("=" * 60)
 
+    async def _export_status_async(self):
+        """Exporta estado sin bloquear el event loop: el snapshot se arma en el
+        thread del loop (que es quien muta failed_jobs/printer_status) y sólo
+        el hash + escritura a disco van al pool de threads"""
+        snapshot = self.status_exporter.build_snapshot(self)
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.status_exporter.write_snapshot, snapshot)
+        if self._dbg:
+            self.logger.debug("📊 Estado exportado para dashboard")
+
+    async def _periodic(self, interval: float, func, name: str):
+        """Corre una tarea periódica con su propio período, independiente del ciclo principal"""
+        while self.running and not self.killer.kill_now:
+            await asyncio.sleep(interval)
+            try:
+                result = func()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.logger.error("💥 Error en tarea periódica %s: %s", name, e)
+                self.stats['total_errors'] += 1
+
     async def main_loop(self):
         """Loop principal con logging optimizado"""
-        if self.logger.isEnabledFor(logging.INFO):
+        if self._info:
             self.logger.info("🔄 INICIANDO LOOP PRINCIPAL")
             self.logger.info(f"   🌐 Odoo: {self.odoo_url}")
             self.logger.info(f"   ⏱️  Intervalo: {self.check_interval}s")
             self.logger.info(f"   💓 Keep-alive: {self.keep_alive_interval}s")
         
-        connector = aiohttp.TCPConnector(limit=20, limit_per_host=5)
-        timeout = aiohttp.ClientTimeout(total=15)
-        
-        heartbeat_counter = 0
-        status_summary_counter = 0
-        status_export_counter = 0
-        
-        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-            while self.running and not self.killer.kill_now:
-                try:
-                    loop_start = time.time()
-                    
-                    # Keep-alive periódico
-                    now = datetime.now()
-                    if (now - self.last_keep_alive_check).total_seconds() >= self.keep_alive_interval:
-                        await self.perform_keep_alive()
-                        self.last_keep_alive_check = now
-                    
-                    # Exportar estado cada 10 ciclos
-                    status_export_counter += 1
-                    if status_export_counter >= 10:
-                        self.status_exporter.export_status(self)
-                        status_export_counter = 0
-                        if self.logger.isEnabledFor(logging.DEBUG):
-                            self.logger.debug("📊 Estado exportado para dashboard")
-                    
-                    # Heartbeat cada 20 ciclos
-                    heartbeat_counter += 1
-                    if heartbeat_counter >= 20:
-                        self.heartbeat()
-                        heartbeat_counter = 0
-                    
-                    # Resumen cada 100 ciclos
-                    status_summary_counter += 1
-                    if status_summary_counter >= 100:
-                        self.print_status_summary()
-                        status_summary_counter = 0
-                    
-                    # Procesar trabajos
-                    tasks = []
-                    for token in self.printers.keys():
-                        tasks.append(self.process_printer_jobs(session, token))
-                    tasks.append(self.process_retry_queue(session))
-                    
-                    results = await asyncio.gather(*tasks, return_exceptions=True)
-                    total_processed = sum(r for r in results[:-1] if isinstance(r, int))
-                    
-                    loop_time = time.time() - loop_start
-                    
-                    if total_processed > 0:
-                        if self.logger.isEnabledFor(logging.INFO):
-                            failed_count = len(self.failed_jobs)
-                            self.logger.info(f"✅ Ciclo: {total_processed} trabajos, "
-                                           f"{failed_count} pendientes ({loop_time:.2f}s)")
-                    else:
-                        if self.logger.isEnabledFor(logging.DEBUG):
-                            self.logger.debug(f"😴 Ciclo sin trabajos ({loop_time:.2f}s)")
-                    
-                    await asyncio.sleep(self.check_interval)
-                    
-                except Exception as e:
-                    self.logger.error(f"💥 Error en loop principal: {e}")
-                    self.stats['total_errors'] += 1
-                    await asyncio.sleep(5)
-        
-        if self.logger.isEnabledFor(logging.INFO):
+        if self._session is None:
+            self._session = self._create_session()
+        if self._print_sem is None:
+            self._print_sem = asyncio.Semaphore(self.print_concurrency)
+
+        # Las tareas periódicas corren con su período natural en tareas propias,
+        # en vez de quedar cuantizadas por contadores sobre el check_interval;
+        # el loop principal queda como despachador puro de trabajos
+        background_tasks = [
+            asyncio.create_task(
+                self._periodic(self.keep_alive_interval, self.perform_keep_alive, 'keep-alive')
+            ),
+            asyncio.create_task(
+                self._periodic(self.check_interval * 10, self._export_status_async, 'export-estado')
+            ),
+            asyncio.create_task(
+                self._periodic(self.check_interval * 20, self.heartbeat, 'heartbeat')
+            ),
+            asyncio.create_task(
+                self._periodic(self.check_interval * 100, self.print_status_summary, 'resumen')
+            ),
+        ]
+
+        # Backoff de errores del loop: exponencial con jitter, se resetea
+        # en el primer ciclo exitoso
+        error_backoff = 1.0
+
+        while self.running and not self.killer.kill_now:
+            try:
+                loop_start = time.time()
+
+                # Procesar trabajos (una sola consulta batch por ciclo)
+                jobs_by_token = await self.get_jobs_batch()
+                tasks = []
+                for token, jobs in jobs_by_token.items():
+                    if jobs:
+                        tasks.append(self.process_printer_jobs(token, jobs))
+                tasks.append(self.process_retry_queue())
+                
+                results = await asyncio.gather(*tasks, return_exceptions=True)
+                total_processed = sum(r for r in results[:-1] if isinstance(r, int))
+                
+                loop_time = time.time() - loop_start
+                
+                if total_processed > 0:
+                    if self._info:
+                        failed_count = len(self.failed_jobs)
+                        self.logger.info(f"✅ Ciclo: {total_processed} trabajos, "
+                                       f"{failed_count} pendientes ({loop_time:.2f}s)")
+                else:
+                    if self._dbg:
+                        self.logger.debug(f"😴 Ciclo sin trabajos ({loop_time:.2f}s)")
+                
+                error_backoff = 1.0
+                await asyncio.sleep(self.check_interval)
+
+            except Exception as e:
+                self.logger.error("💥 Error en loop principal: %s", e)
+                self.stats['total_errors'] += 1
+                error_backoff = min(error_backoff * 2, 30.0)
+                await asyncio.sleep(error_backoff + random.random() * 0.25)
+
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+
+        if self._info:
             self.logger.info("🔚 Loop principal terminado")
     
     async def run(self):
         """Ejecuta cliente con logging configurable"""
         setup_wakelock(self.enable_termux)
         self.running = True
-        
-        if self.logger.isEnabledFor(logging.INFO):
+
+        # Re-entrada: el cierre anterior paró el listener; relanzarlo para
+        # que la cola de logs vuelva a drenarse
+        if self._log_listener is None:
+            self._log_listener = QueueListener(self._log_queue, *self._log_handlers,
+                                               respect_handler_level=True)
+            self._log_listener.start()
+        
+        if self._info:
             self.logger.info("=" * 80)
             self.logger.info("🚀 INICIANDO SERVICIO ESC/POS")
             self.logger.info("=" * 80)
@@ -1714,28 +2170,47 @@ class AsyncClient:
         try:
             await self.main_loop()
         except KeyboardInterrupt:
-            if self.logger.isEnabledFor(logging.INFO):
+            if self._info:
                 self.logger.info("👋 SERVICIO DETENIDO POR USUARIO")
         except Exception as e:
-            self.logger.error(f"💥 ERROR INESPERADO: {e}")
-            if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.error("💥 ERROR INESPERADO: %s", e)
+            if self._dbg:
                 self.logger.exception("Stack trace completo:")
         finally:
             self.running = False
-            self.print_executor.shutdown(wait=True)
+            await self.aclose()
+            if self.print_executor is not None:
+                self.print_executor.shutdown(wait=True)
+            # Re-entrada (tests/uso embebido): load_config reconstruye el pool
+            # y main_loop recrea el semáforo en el event loop nuevo
+            self.print_executor = None
+            self._print_sem = None
+            for token in list(self._printer_conns.keys()):
+                self._drop_printer_connection(token)
             cleanup_wakelock(self.enable_termux)
             
-            if self.logger.isEnabledFor(logging.INFO):
-                self.logger.info("=" * 80)
-                self.logger.info("🔚 SERVICIO CERRADO")
-                self.logger.info(f"📊 Estadísticas finales:")
-                self.logger.info(f"   ✅ Trabajos: {self.stats['jobs_processed']}")
-                self.logger.info(f"   💓 Keep-alives: {self.stats['keep_alives_sent']}")
-                self.logger.info(f"   🔄 Reintentos: {self.stats['jobs_retried']}")
-                self.logger.info(f"   ❌ Errores: {self.stats['total_errors']}")
-                self.logger.info("=" * 80)
+            # Banner final en un solo registro: un lock, un write
+            if self._info:
+                self.logger.info(
+                    "%s\n🔚 SERVICIO CERRADO\n📊 Estadísticas finales:\n"
+                    "   ✅ Trabajos: %s\n   💓 Keep-alives: %s\n"
+                    "   🔄 Reintentos: %s\n   ❌ Errores: %s\n%s",
+                    "=" * 80,
+                    self.stats['jobs_processed'],
+                    self.stats['keep_alives_sent'],
+                    self.stats['jobs_retried'],
+                    self.stats['total_errors'],
+                    "=" * 80
+                )
 
-def main():
+            # Drenar la cola de logs antes de salir
+            if self._log_listener is not None:
+                self._log_listener.stop()
+                self._log_listener = None
+
+@functools.lru_cache(maxsize=1)
+def _parser() -> argparse.ArgumentParser:
+    """Construye el parser una sola vez aunque main() se invoque varias veces"""
     parser = argparse.ArgumentParser(description='Cliente ESC/POS con Control de Logging')
     
     parser.add_argument('--url', required=True,
@@ -1761,7 +2236,10 @@ def main():
     parser.add_argument('--termux', action='store_true',
                        help='Activar características específicas de Termux (wakelock)')
 
-    args = parser.parse_args()
+    return parser
+
+def main():
+    args = _parser().parse_args()
     
     if not ESCPOS_AVAILABLE:
         print("❌ python-escpos no disponible")
@@ -1780,6 +2258,14 @@ def main():
     if not client.load_config(args.config):
         return 1
     
+    # uvloop (libuv) acelera el event loop en cargas de red; opcional,
+    # si no está instalado (p.ej. algunos Termux) se usa el loop estándar
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     try:
         asyncio.run(client.run())
         return 0
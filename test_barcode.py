@@ -4,13 +4,89 @@ Script de debugging para códigos de barras en impresoras ESC/POS
 Prueba diferentes formatos y parámetros para encontrar el que funciona
 """
 
+import argparse
+import asyncio
+import functools
 import json
-import sys
-import time
-from escpos.printer import Network
+import socket
 from datetime import datetime
 
-def test_barcode_formats(ip, port, test_code="4K5TKMZT"):
+# Separadores precalculados (mismas 48/30 columnas en todos los tickets)
+SEP_EQ = "=" * 48 + "\n"
+SEP_DASH = "-" * 48 + "\n"
+SEP_DASH30 = "-" * 30 + "\n"
+SEP_STAR = "*" * 48 + "\n"
+
+# Intentos de código de barras en orden de preferencia; a nivel de módulo
+# para no reconstruir lambdas/listas por cada código impreso
+BARCODE_ATTEMPTS = (
+    ("CODE128 básico", "CODE128", {}),
+    ("CODE128 con width", "CODE128", {"width": 2}),
+    ("CODE128 completo", "CODE128", {"width": 2, "height": 60}),
+    ("CODE39", "CODE39", {}),
+)
+
+@functools.lru_cache(maxsize=1)
+def _buffered_network_cls():
+    """Construye la clase de impresora bufferada importando python-escpos
+    (que arrastra PIL y backends USB) sólo cuando realmente se va a imprimir"""
+    from escpos.printer import Network
+
+    class BufferedNetwork(Network):
+        """Network que acumula los bytes ESC/POS y los envía en un solo sendall.
+
+        Cada set()/barcode()/text() de python-escpos hace un send() propio;
+        bufferear todo el ticket lo convierte en una única escritura al socket.
+        """
+
+        def __init__(self, *args, **kwargs):
+            self._buf = bytearray()
+            super().__init__(*args, **kwargs)
+
+        def _raw(self, msg):
+            self._buf.extend(msg)
+
+        def flush(self):
+            if self._buf:
+                self.device.sendall(bytes(self._buf))
+                self._buf.clear()
+
+    return BufferedNetwork
+
+# Conexiones cacheadas por (ip, puerto): correr ambas pruebas contra la misma
+# impresora paga un solo handshake TCP
+_printer_cache = {}
+
+def get_printer(ip, port):
+    """Devuelve la conexión cacheada a la impresora, creándola la primera vez"""
+    key = (ip, port)
+    printer = _printer_cache.get(key)
+    if printer is None:
+        printer = _buffered_network_cls()(ip, port=port, timeout=10)
+        # TCP_NODELAY: que el flush() del ticket salga sin esperar ACKs
+        # (Nagle); SO_SNDBUF holgado para que quepa en un solo write
+        try:
+            printer.device.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            printer.device.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 65536)
+        except (AttributeError, OSError):
+            pass
+        _printer_cache[key] = printer
+    return printer
+
+def close_printers():
+    """Descarga los buffers pendientes y cierra todas las conexiones cacheadas"""
+    for printer in _printer_cache.values():
+        try:
+            printer.flush()
+        except Exception:
+            pass
+        try:
+            printer.close()
+        except Exception:
+            pass
+    _printer_cache.clear()
+
+def test_barcode_formats(ip, port, test_code="4K5TKMZT", printer=None):
     """
     Prueba diferentes formatos de códigos de barras
     """
@@ -19,18 +95,25 @@ def test_barcode_formats(ip, port, test_code="4K5TKMZT"):
     print(f"🔤 Código de prueba: {test_code}")
     print("=" * 60)
     
+    # Timestamps calculados una vez por ticket
+    now = datetime.now()
+    ts_short = now.strftime('%d/%m/%Y %H:%M')
+    ts_time = now.strftime('%H:%M:%S')
+
     try:
-        # Conectar a impresora
-        printer = Network(ip, port=port, timeout=10)
+        # Conectar a impresora (o reusar la conexión cacheada)
+        if printer is None:
+            printer = get_printer(ip, port)
         print("✅ Conexión establecida")
         
         # Encabezado
         printer.set(align='center', bold=True, width=2, height=2)
         printer.text("PRUEBA CÓDIGOS DE BARRAS\n")
         printer.set(align='center', bold=False, width=1, height=1)
-        printer.text(f"Código: {test_code}\n")
-        printer.text(f"Fecha: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n")
-        printer.text("=" * 48 + "\n")
+        # Bloques de texto contiguos en un solo text(): un send() por bloque
+        printer.text(f"Código: {test_code}\n"
+                     f"Fecha: {ts_short}\n"
+                     + SEP_EQ)
         
         # Lista de formatos a probar
         barcode_tests = [
@@ -53,20 +136,23 @@ def test_barcode_formats(ip, port, test_code="4K5TKMZT"):
             ])
         
         success_count = 0
-        
+
+        # Formas rellenadas precalculadas: no reconstruir el str por intento
+        is_digit = test_code.isdigit()
+        padded12 = test_code.ljust(12, "0")[:12] if is_digit else test_code
+        padded11 = test_code.ljust(11, "0")[:11] if is_digit else test_code
+
         for i, (name, format_type, params) in enumerate(barcode_tests, 1):
-            printer.text(f"\n{i}. Probando: {name}\n")
-            printer.text("-" * 30 + "\n")
+            printer.text(f"\n{i}. Probando: {name}\n" + SEP_DASH30)
             
             try:
-                # Preparar código según el formato
-                test_value = test_code
-                
-                # Ajustes específicos por formato
+                # Ajustes específicos por formato (formas ya precalculadas)
                 if format_type == "EAN13" and len(test_code) < 12:
-                    test_value = test_code.ljust(12, "0")[:12]
+                    test_value = padded12
                 elif format_type == "UPC-A" and len(test_code) < 11:
-                    test_value = test_code.ljust(11, "0")[:11]
+                    test_value = padded11
+                else:
+                    test_value = test_code
                 
                 # Imprimir código de barras
                 if params:
@@ -74,40 +160,40 @@ def test_barcode_formats(ip, port, test_code="4K5TKMZT"):
                 else:
                     printer.barcode(test_value, format_type)
                 
-                printer.text(f"✅ {name}: OK\n")
-                printer.text(f"Código usado: {test_value}\n")
+                printer.text(f"✅ {name}: OK\nCódigo usado: {test_value}\n")
                 success_count += 1
                 print(f"✅ {name}: ÉXITO")
                 
             except Exception as e:
-                printer.text(f"❌ {name}: ERROR\n")
-                printer.text(f"Error: {str(e)[:30]}...\n")
+                printer.text(f"❌ {name}: ERROR\nError: {str(e)[:30]}...\n")
                 print(f"❌ {name}: FALLÓ - {e}")
             
-            printer.text("-" * 30 + "\n")
-            time.sleep(0.5)  # Pausa entre pruebas
+            printer.text(SEP_DASH30)
         
         # Resultados finales
-        printer.text("\n" + "=" * 48 + "\n")
-        printer.text("RESULTADOS FINALES:\n")
-        printer.text(f"Formatos exitosos: {success_count}/{len(barcode_tests)}\n")
-        printer.text(f"Fecha: {datetime.now().strftime('%H:%M:%S')}\n")
-        
-        # Prueba final con fallback visual
-        printer.text("\nFALLBACK VISUAL:\n")
-        printer.text("*" * 48 + "\n")
+        printer.text("\n" + SEP_EQ
+                     + "RESULTADOS FINALES:\n"
+                     f"Formatos exitosos: {success_count}/{len(barcode_tests)}\n"
+                     f"Fecha: {ts_time}\n"
+                     "\nFALLBACK VISUAL:\n" + SEP_STAR)
         printer.set(width=2, height=2, bold=True)
         printer.text(f"  {test_code}  \n")
         printer.set(width=1, height=1, bold=False)
-        printer.text("*" * 48 + "\n")
+        printer.text(SEP_STAR)
         
         # Cortar papel
-        try:
+        # Corte según capacidad del perfil: sin excepción por ticket en
+        # impresoras que no traen cortador
+        profile = getattr(printer, 'profile', None)
+        has_cutter = (profile is None
+                      or profile.supports('paperFullCut')
+                      or profile.supports('paperPartCut'))
+        if has_cutter:
             printer.cut()
-        except:
+        else:
             printer.text("\n\n\n\n")
         
-        printer.close()
+        printer.flush()
         
         print("=" * 60)
         print(f"🏁 PRUEBAS COMPLETADAS: {success_count}/{len(barcode_tests)} exitosos")
@@ -116,8 +202,26 @@ def test_barcode_formats(ip, port, test_code="4K5TKMZT"):
     except Exception as e:
         print(f"💥 ERROR GENERAL: {e}")
         return False
+    finally:
+        # No dejar medio ticket en el buffer: la conexión se comparte con
+        # la siguiente prueba
+        if printer is not None and getattr(printer, '_buf', None):
+            printer._buf.clear()
+
+async def test_barcode_formats_multi(targets, test_code="4K5TKMZT"):
+    """
+    Corre la prueba de formatos contra varias impresoras en paralelo
 
-def test_playground_receipt_full(ip, port):
+    Cada impresora es I/O independiente: python-escpos es síncrono, así que
+    cada una corre en su thread vía asyncio.to_thread y se espera el conjunto.
+    """
+    results = await asyncio.gather(
+        *(asyncio.to_thread(test_barcode_formats, ip, port, test_code)
+          for ip, port in targets)
+    )
+    return all(results)
+
+def test_playground_receipt_full(ip, port, printer=None):
     """
     Prueba completa de recibo de parque como el sistema real
     """
@@ -147,8 +251,14 @@ def test_playground_receipt_full(ip, port):
         "payments": [{"payment_method": "Efectivo", "amount": 8.0}]
     }
     
+    # Timestamps calculados una vez por ticket
+    now = datetime.now()
+    ts_short = now.strftime('%d/%m/%Y %H:%M')
+    ts_full = now.strftime('%d/%m/%Y %H:%M:%S')
+
     try:
-        printer = Network(ip, port=port, timeout=10)
+        if printer is None:
+            printer = get_printer(ip, port)
         
         # === IMPRESIÓN IGUAL AL SISTEMA REAL ===
         company_name = test_data.get('company_name', 'PARQUE INFANTIL')
@@ -159,23 +269,22 @@ def test_playground_receipt_full(ip, port):
         printer.text(f"{company_name}\n")
         
         printer.set(align='center', width=1, height=1, bold=False)
-        printer.text("=" * 48 + "\n")
+        printer.text(SEP_EQ)
         
         # Información básica
         printer.set(align='left', bold=True)
         printer.text(f"ENTRADA PARQUE: {tracking_number}\n")
         printer.set(bold=False)
         
-        order_date = test_data.get('datetime', datetime.now().strftime('%d/%m/%Y %H:%M'))
-        printer.text(f"Fecha: {order_date}\n")
-        
+        order_date = test_data.get('datetime', ts_short)
         server = test_data.get('server', 'N/A')
         customer = test_data.get('customer', 'Cliente General')
-        printer.text(f"Mesero: {server}\n")
+
+        # Bloque de info en un solo text(): un send() en lugar de cuatro
+        info = f"Fecha: {order_date}\nMesero: {server}\n"
         if customer != 'Cliente General':
-            printer.text(f"Cliente: {customer[:40]}\n")
-        
-        printer.text("=" * 48 + "\n")
+            info += f"Cliente: {customer[:40]}\n"
+        printer.text(info + SEP_EQ)
         
         # Códigos de parque
         playground_codes = test_data.get('playground_codes', [])
@@ -184,7 +293,7 @@ def test_playground_receipt_full(ip, port):
             printer.set(align='center', bold=True, width=1, height=2)
             printer.text("🎮 ENTRADAS PARQUE INFANTIL 🎮\n")
             printer.set(align='left', bold=False, width=1, height=1)
-            printer.text("=" * 48 + "\n")
+            printer.text(SEP_EQ)
             
             for i, code_data in enumerate(playground_codes, 1):
                 product_name = code_data.get('product_name', 'Entrada Parque')
@@ -197,9 +306,8 @@ def test_playground_receipt_full(ip, port):
                 printer.set(bold=True)
                 printer.text(f"{i}. {product_name}\n")
                 printer.set(bold=False)
-                printer.text(f"Cantidad: {qty} | Duración: {duration} min\n")
-                printer.text(f"Precio: Bs.{price:.2f}\n")
-                printer.text("-" * 48 + "\n")
+                printer.text(f"Cantidad: {qty} | Duración: {duration} min\n"
+                             f"Precio: Bs.{price:.2f}\n" + SEP_DASH)
                 
                 # CÓDIGOS DE BARRAS CON MÚLTIPLES INTENTOS
                 if code:
@@ -210,34 +318,24 @@ def test_playground_receipt_full(ip, port):
                     
                     # Múltiples intentos
                     barcode_success = False
-                    attempts = [
-                        ("CODE128 básico", lambda: printer.barcode(code, 'CODE128')),
-                        ("CODE128 con width", lambda: printer.barcode(code, 'CODE128', width=2)),
-                        ("CODE128 completo", lambda: printer.barcode(code, 'CODE128', width=2, height=60)),
-                        ("CODE39", lambda: printer.barcode(code, 'CODE39')),
-                    ]
-                    
-                    for attempt_name, attempt_func in attempts:
-                        if not barcode_success:
-                            try:
-                                attempt_func()
-                                printer.text("\n")
-                                barcode_success = True
-                                print(f"✅ Código de barras exitoso: {attempt_name}")
-                                break
-                            except Exception as e:
-                                print(f"⚠️ {attempt_name} falló: {e}")
+                    for attempt_name, fmt, kw in BARCODE_ATTEMPTS:
+                        try:
+                            printer.barcode(code, fmt, **kw)
+                            printer.text("\n")
+                            barcode_success = True
+                            print(f"✅ Código de barras exitoso: {attempt_name}")
+                            break
+                        except Exception as e:
+                            print(f"⚠️ {attempt_name} falló: {e}")
                     
                     # Fallback visual si todo falla
                     if not barcode_success:
                         print(f"❌ TODOS los códigos de barras fallaron, usando fallback visual")
-                        printer.text("*" * 48 + "\n")
+                        printer.text(SEP_STAR)
                         printer.set(width=2, height=2, bold=True)
                         printer.text(f"  {code}  \n")
                         printer.set(width=1, height=1, bold=False)
-                        printer.text("*" * 48 + "\n")
-                        printer.text("** ESCANEAR CÓDIGO MANUAL **\n")
-                        printer.text("*" * 48 + "\n")
+                        printer.text(SEP_STAR + "** ESCANEAR CÓDIGO MANUAL **\n" + SEP_STAR)
                     
                     # Código como texto
                     printer.set(align='center', bold=True)
@@ -245,72 +343,80 @@ def test_playground_receipt_full(ip, port):
                     printer.set(bold=False)
                     
                     printer.set(align='left')
-                    printer.text("=" * 48 + "\n")
+                    printer.text(SEP_EQ)
         
         # Total
-        printer.text("=" * 48 + "\n")
+        printer.text(SEP_EQ)
         total_final = test_data.get('amount_total', 0)
         printer.set(bold=True, width=1, height=2)
         printer.text(f"{'TOTAL:':<24} Bs.{total_final:>11.2f}\n")
         printer.set(bold=False, width=1, height=1)
-        printer.text("=" * 48 + "\n")
+        printer.text(SEP_EQ)
         
         # Pagos
         payments = test_data.get('payments', [])
         if payments:
-            printer.text("Método(s) de pago:\n")
+            pago_lines = ["Método(s) de pago:\n"]
             for payment in payments:
                 method = payment.get('payment_method', 'Efectivo')
                 amount = float(payment.get('amount', 0))
-                printer.text(f"  {method}: Bs.{amount:.2f}\n")
+                pago_lines.append(f"  {method}: Bs.{amount:.2f}\n")
+            printer.text("".join(pago_lines))
         
         # Pie
         printer.set(align='center')
         printer.set(bold=True)
         printer.text("🎈 ¡DISFRUTEN EL PARQUE! 🎈\n")
         printer.set(bold=False)
-        printer.text(f"Impreso: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}\n")
+        printer.text(f"Impreso: {ts_full}\n")
         
         # Cortar
-        try:
+        # Corte según capacidad del perfil: sin excepción por ticket en
+        # impresoras que no traen cortador
+        profile = getattr(printer, 'profile', None)
+        has_cutter = (profile is None
+                      or profile.supports('paperFullCut')
+                      or profile.supports('paperPartCut'))
+        if has_cutter:
             printer.cut()
-        except:
+        else:
             printer.text("\n\n\n\n")
         
-        printer.close()
+        printer.flush()
         print("✅ Prueba completa de recibo terminada")
         return True
         
     except Exception as e:
         print(f"💥 ERROR en prueba completa: {e}")
         return False
+    finally:
+        # No dejar medio ticket en el buffer: la conexión se comparte con
+        # la siguiente prueba
+        if printer is not None and getattr(printer, '_buf', None):
+            printer._buf.clear()
 
 def main():
-    if len(sys.argv) < 3:
-        print("Uso: python debug_barcode.py <IP> <PUERTO> [código_opcional]")
-        print("Ejemplo: python debug_barcode.py 192.168.1.122 9100")
-        print("Ejemplo: python debug_barcode.py 192.168.1.122 9100 4K5TKMZT")
-        sys.exit(1)
-    
-    ip = sys.argv[1]
-    port = int(sys.argv[2])
-    test_code = sys.argv[3] if len(sys.argv) > 3 else "4K5TKMZT"
-    
-    print("SELECCIONE TIPO DE PRUEBA:")
-    print("1. Prueba rápida de formatos de código de barras")
-    print("2. Prueba completa de recibo de parque") 
-    print("3. Ambas pruebas")
-    
-    choice = input("Opción (1-3): ").strip()
-    
-    if choice in ["1", "3"]:
-        print("\n" + "="*60)
-        test_barcode_formats(ip, port, test_code)
-    
-    if choice in ["2", "3"]:
-        print("\n" + "="*60)
-        test_playground_receipt_full(ip, port)
-    
+    parser = argparse.ArgumentParser(
+        description='Debug de códigos de barras para impresoras ESC/POS')
+    parser.add_argument('ip', help='IP de la impresora (ej: 192.168.1.122)')
+    parser.add_argument('port', type=int, help='Puerto (normalmente 9100)')
+    parser.add_argument('code', nargs='?', default='4K5TKMZT',
+                        help='Código de prueba (default: 4K5TKMZT)')
+    parser.add_argument('--mode', choices=['formats', 'receipt', 'both'],
+                        default='both',
+                        help='Prueba a ejecutar: formatos, recibo o ambas (default: both)')
+
+    args = parser.parse_args()
+
+    if args.mode in ('formats', 'both'):
+        print("\n" + "=" * 60)
+        asyncio.run(test_barcode_formats_multi([(args.ip, args.port)], args.code))
+
+    if args.mode in ('receipt', 'both'):
+        print("\n" + "=" * 60)
+        test_playground_receipt_full(args.ip, args.port)
+
+    close_printers()
     print("\n🏁 TODAS LAS PRUEBAS COMPLETADAS")
 
 if __name__ == "__main__":